@@ -1,14 +1,24 @@
+from typing import List
+
 from flask import Flask
 from flask import g
 from flask import request
 from flask_cors import CORS, cross_origin
 
+from Pynitus.api import response_cache
+from Pynitus.auth.context import AuthContext
+from Pynitus.auth.reaper import init_reaper
 from Pynitus.auth.user_cache import init_user_cache
 from Pynitus.framework import memcache
-from Pynitus.framework.pubsub import pub, init_pubsub
+from Pynitus.framework.pubsub import pub, sub, init_pubsub
+from Pynitus.io import config
 from Pynitus.io.config import init_config
 from Pynitus.io.storage import init_storage
+from Pynitus.model import autocomplete
+from Pynitus.model.autocomplete import init_autocomplete
+from Pynitus.model.db import playable  # Registers the listener keeping the playable flags up to date
 from Pynitus.model.db.database import db_session, init_db
+from Pynitus.model.db.events import init_library_events
 from Pynitus.player.contributor_queue import init_contributor_queue
 from Pynitus.player.player import init_player
 from Pynitus.player.queue import init_queue
@@ -18,22 +28,49 @@ from Pynitus.upload import init_upload
 app = Flask(__name__)
 
 if app.debug:
-    CORS(app)
+    # Paginated listings send the cursor of their next page in a header, which browsers hide unless exposed
+    CORS(app, expose_headers=["X-Next-Cursor"])
+
+def config_changed(changed: List[str]) -> None:
+    """
+    » Subscribed to config_changed
+    Applies changed settings of the server process.
+    :param changed: The keys whose values changed
+    :return: None
+    """
+
+    if "memcache_pool_size" in changed:
+        memcache.init_memcache(config.get("memcache_pool_size"))
+
+    if "response_cache_size" in changed:
+        response_cache.init_response_cache(config.get("response_cache_size"))
+
+    if "upload_path" in changed:
+        init_storage()
+
 
 with app.app_context():
     if memcache.get("pynitus.initialized") is None:
         init_config()
         init_pubsub()
         init_db()
+        init_library_events()
+        init_autocomplete()
         init_user_cache()
+        init_reaper()
         init_player()
         init_queue()
         init_contributor_queue()
         init_voting()
         init_storage()
         init_upload()
+        sub('config_changed', config_changed)
         memcache.set("pynitus.initialized", True)
 
+    memcache.init_memcache(config.get("memcache_pool_size"))
+    response_cache.init_response_cache(config.get("response_cache_size"))
+    autocomplete.start_building()
+
 
 @app.teardown_appcontext
 def shutdown_session(exception=None):
@@ -46,6 +83,7 @@ def refresh_user_session():
     user_token = request.args.get('token')
     user_token = user_token if user_token is not None else request.remote_addr
     g.user_token = user_token
+    g.auth = AuthContext(user_token)
     pub('user_activity', user_token)
 
 
@@ -56,3 +94,6 @@ import Pynitus.api.queue
 import Pynitus.api.auth
 import Pynitus.api.upload
 import Pynitus.api.playlists
+import Pynitus.api.search
+import Pynitus.api.autocomplete
+import Pynitus.api.library
@@ -1,22 +1,43 @@
-from flask import request
+from flask import json
 
 from Pynitus import app
 from Pynitus.api.encoders import AlbumEncoder
-from Pynitus.api.request_util import expect_optional
+from Pynitus.api.request_util import expect_optional, decode_cursor, paged, stream_format, streamed, library_etag, \
+    response_format, Response
+from Pynitus.api.response_cache import cached
 from Pynitus.model import albums
 
 
 @app.route('/albums/all', methods=['GET'])
-@expect_optional(('offset', int), ('amount', int))
-def albums_all(offset=0, amount=0):
-    return AlbumEncoder().encode(albums.all(offset=offset, limit=amount))
+@library_etag()
+@cached()
+@expect_optional(('offset', int), ('amount', int), ('cursor', decode_cursor), ('stream', stream_format),
+                 ('format', response_format))
+def albums_all(offset=0, amount=0, cursor=None, stream=None, format="nested"):
+    if stream is not None:
+        if format == "compound":
+            return json.dumps({
+                'success': False,
+                'reason': Response.BAD_REQUEST
+            })
+
+        return streamed(AlbumEncoder(), albums.all(offset=offset, limit=amount, after=cursor, streamed=True), stream)
+
+    page = albums.all(offset=offset, limit=amount, after=cursor)
+    return paged(AlbumEncoder(compound=format == "compound").encode(page), page)
 
 
 @app.route('/albums/artist/<int:artist_id>', methods=['GET'])
-def albums_artist(artist_id):
-    return AlbumEncoder().encode(albums.from_artist(artist_id))
+@library_etag()
+@cached()
+@expect_optional(('offset', int), ('amount', int), ('cursor', decode_cursor), ('format', response_format))
+def albums_artist(artist_id, offset=0, amount=0, cursor=None, format="nested"):
+    page = albums.from_artist(artist_id, offset=offset, limit=amount, after=cursor)
+    return paged(AlbumEncoder(compound=format == "compound").encode(page), page)
 
 
 @app.route('/albums/id/<int:album_id>', methods=['GET'])
+@library_etag()
+@cached()
 def albums_id(album_id):
     return AlbumEncoder().encode(albums.get(album_id))
@@ -1,15 +1,24 @@
 from Pynitus import app
 from Pynitus.api.encoders import ArtistEncoder
-from Pynitus.api.request_util import expect_optional
+from Pynitus.api.request_util import expect_optional, decode_cursor, paged, stream_format, streamed, library_etag
+from Pynitus.api.response_cache import cached
 from Pynitus.model import artists
 
 
 @app.route('/artists/all', methods=['GET'])
-@expect_optional(('offset', int), ('amount', int))
-def artists_all(offset=0, amount=0):
-    return ArtistEncoder().encode(artists.all(offset=offset, limit=amount))
+@library_etag()
+@cached()
+@expect_optional(('offset', int), ('amount', int), ('cursor', decode_cursor), ('stream', stream_format))
+def artists_all(offset=0, amount=0, cursor=None, stream=None):
+    if stream is not None:
+        return streamed(ArtistEncoder(), artists.all(offset=offset, limit=amount, after=cursor, streamed=True), stream)
+
+    page = artists.all(offset=offset, limit=amount, after=cursor)
+    return paged(ArtistEncoder().encode(page), page)
 
 
 @app.route('/artists/id/<int:artist_id>', methods=['GET'])
+@library_etag()
+@cached()
 def artists_id(artist_id):
     return ArtistEncoder().encode(artists.get(artist_id))
@@ -4,7 +4,7 @@ from flask import json
 from Pynitus import app
 from Pynitus.api.request_util import Response, expect, expect_optional
 from Pynitus.auth import authtools
-from Pynitus.auth import user_cache
+from Pynitus.auth.hashing import HashingOverloaded
 
 
 @app.route('/auth/register', methods=['POST'])
@@ -12,15 +12,21 @@ from Pynitus.auth import user_cache
 @expect_optional(('privilege', int))
 def register(username="", password="", privilege=0):
 
-    if not user_cache.authorize(g.user_token, privilege):
+    if not g.auth.authorize(privilege):
 
         return json.dumps({
             'success': False,
             'reason': Response.UNAUTHORIZED
         })
     
-    success = authtools.register(username, password, privilege)
-    
+    try:
+        success = authtools.register(username, password, privilege)
+    except HashingOverloaded:
+        return json.dumps({
+            'success': False,
+            'reason': Response.SERVER_BUSY
+        })
+
     r = {'success': success}
 
     if not success:
@@ -36,7 +42,14 @@ def login(username="", password=""):
     success = False
     user_token = ""
 
-    user_token = authtools.authenticate(username, password)
+    try:
+        user_token = authtools.authenticate(username, password)
+    except HashingOverloaded:
+        return json.dumps({
+            'success': False,
+            'reason': Response.SERVER_BUSY
+        })
+
     success = len(user_token) > 0
 
     r = {'success': success}
@@ -47,3 +60,21 @@ def login(username="", password=""):
         r['reason'] = Response.BAD_CREDENTIALS
 
     return json.dumps(r)
+
+
+@app.route('/auth/logout', methods=['POST'])
+def logout():
+
+    if not g.auth.authenticated:
+        return json.dumps({
+            'success': False,
+            'reason': Response.UNAUTHORIZED
+        })
+
+    if not authtools.logout(g.user_token):
+        return json.dumps({
+            'success': False,
+            'reason': Response.SERVER_BUSY
+        })
+
+    return json.dumps({'success': True})
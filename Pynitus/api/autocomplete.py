@@ -0,0 +1,12 @@
+from flask import json
+
+from Pynitus import app
+from Pynitus.api.request_util import expect, expect_optional
+from Pynitus.model import autocomplete
+
+
+@app.route('/autocomplete', methods=['GET'])
+@expect(('q', str))
+@expect_optional(('amount', int))
+def autocomplete_suggest(q=None, amount=10):
+    return json.dumps(autocomplete.suggest(q, limit=amount))
@@ -1,104 +1,84 @@
 import json
 
-from Pynitus.model import playlists
+from Pynitus.api.serialization import Plan, ListOf
 from Pynitus.model import tracks
 from Pynitus.model.db.models import Track, Artist, Album, Playlist
 
 
 class APIEncoder(json.JSONEncoder):
+    """
+    Encodes objects, and lists of them, by the plan of the subclass.
+    Lists are encoded as compound documents, if compound is set.
+    Anything else is left to json.
+    """
 
-    encodes_class = None
+    plan = None  # type: Plan
 
-    def __init__(self, no_data=False):
+    def __init__(self, no_data=False, compound=False):
         super().__init__()
         self.__no_data = no_data
+        self.__compound = compound
 
-    def default(self, o):
-        if isinstance(o, self.encodes_class):
-            r = self.encode_metadata(o)
+    def encode(self, o):
+        if isinstance(o, self.plan.model):
+            return self.plan.encode(o, not self.__no_data)
 
-            if self.__no_data:
-                return r
+        if isinstance(o, (list, tuple)) and all(isinstance(x, self.plan.model) for x in o):
+            if self.__compound:
+                return self.plan.encode_compound(o)
 
-            r['data'] = self.encode_data(o)
-            return r
+            return self.plan.encode_many(o, not self.__no_data)
 
-        return json.JSONEncoder.default(self, o)
+        return super().encode(o)
 
-    def encode_metadata(self, o):
-        return NotImplemented
+    def default(self, o):
+        if isinstance(o, self.plan.model):
+            return self.plan.as_dict(o, not self.__no_data)
 
-    def encode_data(self, o):
-        return NotImplemented
+        return json.JSONEncoder.default(self, o)
 
 
 class ArtistEncoder(APIEncoder):
 
-    encodes_class = Artist
-
-    def encode_metadata(self, o):
-        return {'id': o.id, 'type': 'artist', 'follow': '/artists/id/' + str(o.id)}
-
-    def encode_data(self, o):
-        return {'name': o.name}
+    plan = Plan(Artist, 'artist', '/artists/id/', [
+        ('name', 'name'),
+        ('track_count', 'track_count'),
+        ('album_count', 'album_count')
+    ])
 
 
 class AlbumEncoder(APIEncoder):
 
-    encodes_class = Album
-
-    def encode_metadata(self, o):
-        return {'id': o.id, 'type': 'album', 'follow': '/albums/id/' + str(o.id)}
-
-    def encode_data(self, o):
-        return {
-            'title': o.title,
-            'artist': ArtistEncoder().default(o.artist)
-        }
+    plan = Plan(Album, 'album', '/albums/id/', [
+        ('title', 'title'),
+        ('artist', 'artist', ArtistEncoder.plan),
+        ('track_count', 'track_count')
+    ])
 
 
 class TrackEncoder(APIEncoder):
 
-    encodes_class = Track
-
-    def encode_metadata(self, o):
-        return {'id': o.id, 'type': 'track', 'follow': '/tracks/id/' + str(o.id)}
-
-    def encode_data(self, o):
-        return {
-            'artist': ArtistEncoder().default(o.artist),
-            'album': AlbumEncoder().default(o.album),
-            'title': o.title
-        }
+    plan = Plan(Track, 'track', '/tracks/id/', [
+        ('artist', 'artist', ArtistEncoder.plan),
+        ('album', 'album', AlbumEncoder.plan),
+        ('title', 'title')
+    ])
 
 
 class DetailedTrackEncoder(APIEncoder):
 
-    encodes_class = Track
-
-    def encode_metadata(self, o):
-        return {'id': o.id, 'type': 'track', 'follow': '/tracks/id/' + str(o.id)}
-
-    def encode_data(self, o):
-        return {
-            'artist': ArtistEncoder().default(o.artist),
-            'album': AlbumEncoder().default(o.album),
-            'title': o.title
-            # TODO: tag info
-        }
+    plan = Plan(Track, 'track', '/tracks/id/', [
+        ('artist', 'artist', ArtistEncoder.plan),
+        ('album', 'album', AlbumEncoder.plan),
+        ('title', 'title')
+        # TODO: tag info
+    ])
 
 
 class PlaylistEncoder(APIEncoder):
 
-    encodes_class = Playlist
-
-    def encode_metadata(self, o):
-        return {'id': o.id, 'type': 'playlist', 'follow': '/playlists/id/' + str(o.id)}
-
-    def encode_data(self, o: Playlist):
-        track_encoder = TrackEncoder()
-        return {
-            'name': o.name,
-            'username': o.username,
-            'tracks': [track_encoder.default(track) for track in tracks.on_playlist(o.id)]
-        }
+    plan = Plan(Playlist, 'playlist', '/playlists/id/', [
+        ('name', 'name'),
+        ('username', 'username'),
+        ('tracks', 'id', ListOf(TrackEncoder.plan, tracks.on_playlist))
+    ])
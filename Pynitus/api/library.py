@@ -0,0 +1,13 @@
+from flask import json
+
+from Pynitus import app
+from Pynitus.api.request_util import library_etag
+from Pynitus.api.response_cache import cached
+from Pynitus.model import library
+
+
+@app.route('/library/stats', methods=['GET'])
+@library_etag()
+@cached()
+def library_stats():
+    return json.dumps(library.stats())
@@ -14,8 +14,7 @@ from Pynitus.player import queue
 
 @app.route('/queue/items', methods=['GET'])
 def queue_items():
-    tracks_in_queue = [tracks.get(i) for i in queue.queue()]
-    return TrackEncoder().encode(tracks_in_queue)
+    return TrackEncoder().encode(tracks.get_many(queue.queue()))
 
 
 @app.route('/queue/current', methods=['GET'])
@@ -1,15 +1,23 @@
+import base64
 from enum import IntEnum
 from functools import wraps
-from typing import List, Tuple
+from typing import List, Tuple, Callable, Any, Iterable, Optional
 
+from flask import Response as HTTPResponse
+from flask import g
 from flask import json
+from flask import make_response
 from flask import request
+from flask import stream_with_context
+
+from Pynitus.model import library
 
 
 class Response(IntEnum):
     # API basics
     BAD_REQUEST = 0
     INVALID_OBJECT_ID = 1
+    SERVER_BUSY = 2
 
     # Authorization related
     UNAUTHORIZED = 100
@@ -27,6 +35,97 @@ class Response(IntEnum):
 
 # TODO: user readable description for error enum
 
+STREAM_FORMATS = {
+    "json": "application/json",  # A single JSON array, like the response without streaming
+    "ndjson": "application/x-ndjson"  # One JSON object per line
+}
+
+RESPONSE_FORMATS = {
+    "nested",  # Objects contain the artists and albums they refer to
+    "compound"  # Objects refer to artists and albums by id, which are included once next to the data
+}
+
+
+def decode_cursor(value: str) -> Tuple[Any, int]:
+    """
+    Decodes a cursor as handed out by paged().
+    Use it as the type of a cursor argument in expect() or expect_optional().
+    :param value: The cursor
+    :return: The position in the result it points to
+    """
+    sort_key, object_id = json.loads(base64.urlsafe_b64decode(value.encode()).decode())
+    return sort_key, int(object_id)
+
+
+def paged(body: str, page) -> Tuple[str, int, dict]:
+    """
+    Adds the cursor pointing to the next page of a paginated result to a response.
+    The cursor is sent in the X-Next-Cursor header, if there may be more results.
+    :param body: The encoded page
+    :param page: The page, as returned by the model
+    :return: The response
+    """
+    headers = dict({})
+
+    if getattr(page, 'after', None) is not None:
+        headers['X-Next-Cursor'] = base64.urlsafe_b64encode(json.dumps(page.after).encode()).decode()
+
+    return body, 200, headers
+
+
+def stream_format(value: str) -> str:
+    """
+    Checks the format of a streamed response.
+    Use it as the type of a stream argument in expect() or expect_optional().
+    :param value: The format, see STREAM_FORMATS
+    :return: The format
+    """
+    if value not in STREAM_FORMATS:
+        raise ValueError(value)
+
+    return value
+
+
+def response_format(value: str) -> str:
+    """
+    Checks the format of a list response.
+    Use it as the type of a format argument in expect() or expect_optional().
+    :param value: The format, see RESPONSE_FORMATS
+    :return: The format
+    """
+    if value not in RESPONSE_FORMATS:
+        raise ValueError(value)
+
+    return value
+
+
+def streamed(encoder, batches: Iterable[List[Any]], format: str) -> HTTPResponse:
+    """
+    Sends a result while it is being encoded, as a chunked response.
+    Only one batch of the result is held in memory at a time.
+    :param encoder: The APIEncoder for the results
+    :param batches: The result in batches, as returned by the model with streamed=True
+    :param format: The format of the response, see STREAM_FORMATS
+    :return: The response
+    """
+
+    def generate():
+        separator = "" if format == "ndjson" else "["
+
+        for batch in batches:
+            encoded = encoder.plan.encode_each(batch)
+
+            if format == "ndjson":
+                yield "".join(o + "\n" for o in encoded)
+            elif len(encoded) > 0:
+                yield separator + ", ".join(encoded)
+                separator = ", "
+
+        if format == "json":
+            yield "[]" if separator == "[" else "]"
+
+    return HTTPResponse(stream_with_context(generate()), mimetype=STREAM_FORMATS[format])
+
 
 def expect(*arguments: List[Tuple[str, type]]):
 
@@ -90,3 +189,123 @@ def expect_optional(*arguments: List[Tuple[str, type]]):
         return wrapped
 
     return wrapper
+
+
+def expect_user(privilege: int=0):
+    """
+    Only allows logged in users with at least the given privilege level to
+    access the endpoint.
+    :param privilege: The required privilege level
+    """
+
+    def wrapper(function):
+
+        @wraps(function)
+        def wrapped(*args, **kwargs):
+
+            if not g.auth.authenticated or not g.auth.authorize(privilege):
+                return json.dumps({
+                    'success': False,
+                    'reason': Response.UNAUTHORIZED
+                })
+
+            return function(*args, **kwargs)
+
+        return wrapped
+
+    return wrapper
+
+
+def expect_owner(id_argument: str, getter: Callable[[Any], Any], as_argument: str):
+    """
+    Only allows the owner of an object to access the endpoint.
+    The object is looked up using the getter and the value of id_argument,
+    which has to be provided by expect() or the route. It is then handed to
+    the endpoint as as_argument, so that the endpoint doesn't have to
+    look it up again.
+    :param id_argument: The name of the argument holding the object's id
+    :param getter: A method returning the object by it's id or None
+    :param as_argument: The name of the argument the object is handed over as
+    """
+
+    def wrapper(function):
+
+        @wraps(function)
+        def wrapped(*args, **kwargs):
+
+            if not g.auth.authenticated:
+                return json.dumps({
+                    'success': False,
+                    'reason': Response.UNAUTHORIZED
+                })
+
+            o = getter(kwargs.get(id_argument))
+
+            if o is None:
+                return json.dumps({
+                    'success': False,
+                    'reason': Response.INVALID_OBJECT_ID
+                })
+
+            if not g.auth.owns(o):
+                return json.dumps({
+                    'success': False,
+                    'reason': Response.UNAUTHORIZED
+                })
+
+            kwargs[as_argument] = o
+            return function(*args, **kwargs)
+
+        return wrapped
+
+    return wrapper
+
+
+def current_library_version() -> Optional[int]:
+    """
+    :return: The library version, which is read once per request, or None if it is unknown
+    """
+
+    if 'library_version' not in g:
+        g.library_version = library.version()
+
+    return g.library_version
+
+
+def library_etag():
+    """
+    Lets clients revalidate responses which only depend on the library and playlists.
+    Their ETag is the library version, so a request whose If-None-Match still
+    matches it is answered with 304 Not Modified without calling the endpoint.
+    The ETag is weak, since the response cache sends the same one for every content encoding.
+    Responses get no ETag while the version is unknown.
+    """
+
+    def wrapper(function):
+
+        @wraps(function)
+        def wrapped(*args, **kwargs):
+
+            # Read before the response is built, a change in between only makes the ETag outdated
+            version = current_library_version()
+
+            if version is None:
+                return function(*args, **kwargs)
+
+            etag = str(version)
+
+            if request.if_none_match.contains_weak(etag):
+                response = HTTPResponse(status=304)
+                response.set_etag(etag, weak=True)
+                return response
+
+            response = make_response(function(*args, **kwargs))
+
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+
+            return response
+
+        return wrapped
+
+    return wrapper
@@ -0,0 +1,189 @@
+import gzip
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Response as HTTPResponse
+from flask import make_response
+from flask import request
+
+from Pynitus.api.request_util import current_library_version
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses of GET endpoints, which only depend on the library and playlists,
+# are kept in process memory. They are looked up by the path and arguments
+# of the request, except the user token, since responses are the same for
+# every user. All entries belong to one library version: when a request sees
+# a newer version, the library was changed and all entries are dropped.
+# While the version is unknown, changes can't be noticed, so the cache is bypassed.
+#
+# Bodies are stored uncompressed and compressed with gzip and, if the
+# brotli package is installed, brotli, so a hit costs one dict lookup
+# whatever encoding the client accepts. Entries are evicted least recently
+# used first, once they take up more than max_bytes.
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+MAX_ENTRY_SHARE = 8  # Bodies larger than 1/MAX_ENTRY_SHARE of the cache aren't cached
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Higher qualities compress large bodies much slower
+IGNORED_ARGUMENTS = {"token"}
+STORED_HEADERS = {"Content-Type", "X-Next-Cursor"}
+
+Entry = namedtuple("Entry", ["bodies", "headers", "size"])
+
+__entries = OrderedDict()  # type: OrderedDict[Tuple, Entry]
+__max_bytes = DEFAULT_MAX_BYTES
+__bytes = 0
+__version = None  # type: Optional[int]
+__hits = 0
+__misses = 0
+__lock = threading.Lock()
+
+
+def init_response_cache(max_bytes: Optional[int]) -> None:
+    """
+    Sets how much memory a process may use for cached responses.
+    :param max_bytes: The maximum size of all cached bodies, 0 disables the cache, None keeps the default
+    :return: None
+    """
+    global __max_bytes
+
+    if max_bytes is not None:
+        __max_bytes = max(max_bytes, 0)
+        clear()
+
+
+def clear() -> None:
+    """
+    Drops all cached responses.
+    :return: None
+    """
+    global __bytes
+
+    with __lock:
+        __entries.clear()
+        __bytes = 0
+
+
+def stats() -> Dict[str, Any]:
+    """
+    :return: The number of hits and misses since the process started, the number of entries and their size
+    """
+    with __lock:
+        return {'hits': __hits, 'misses': __misses, 'entries': len(__entries), 'bytes': __bytes}
+
+
+def __compress(body: bytes) -> Dict[str, bytes]:
+
+    bodies = {'identity': body, 'gzip': gzip.compress(body, GZIP_LEVEL)}
+
+    if brotli is not None:
+        bodies['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    # Compression may not pay off for small bodies
+    return {encoding: b for encoding, b in bodies.items() if encoding == 'identity' or len(b) < len(body)}
+
+
+def __lookup(key: Tuple, version: int) -> Optional[Entry]:
+    global __version, __bytes, __hits, __misses
+
+    with __lock:
+        if __version is None or version > __version:
+            __entries.clear()
+            __bytes = 0
+            __version = version
+
+        entry = __entries.get(key) if version == __version else None
+
+        if entry is None:
+            __misses += 1
+            return None
+
+        __entries.move_to_end(key)
+        __hits += 1
+        return entry
+
+
+def __store(key: Tuple, version: int, entry: Entry) -> None:
+    global __bytes
+
+    with __lock:
+        # The library may have changed while the response was built
+        if version != __version or key in __entries:
+            return
+
+        __entries[key] = entry
+        __bytes += entry.size
+
+        while __bytes > __max_bytes:
+            _, evicted = __entries.popitem(last=False)
+            __bytes -= evicted.size
+
+
+def __respond(entry: Entry, hit: bool) -> HTTPResponse:
+
+    encoding = request.accept_encodings.best_match([e for e in ['br', 'gzip'] if e in entry.bodies], 'identity')
+
+    response = HTTPResponse(entry.bodies[encoding], headers=entry.headers)
+    response.vary.add('Accept-Encoding')
+    response.headers['X-Cache'] = "HIT" if hit else "MISS"
+
+    if encoding != 'identity':
+        response.content_encoding = encoding
+
+    return response
+
+
+def cached():
+    """
+    Serves responses of an endpoint from the cache.
+    Only use it on GET endpoints, whose responses depend on nothing but
+    the library, playlists and the arguments of the request.
+    """
+
+    def wrapper(function):
+
+        @wraps(function)
+        def wrapped(*args, **kwargs):
+
+            version = current_library_version()
+
+            if __max_bytes == 0 or version is None:
+                return function(*args, **kwargs)
+            key = (request.path, tuple(sorted(
+                (name, value) for name, value in request.args.items(multi=True) if name not in IGNORED_ARGUMENTS
+            )))
+
+            entry = __lookup(key, version)
+
+            if entry is not None:
+                return __respond(entry, True)
+
+            response = make_response(function(*args, **kwargs))
+
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            body = response.get_data()
+
+            if len(body) > __max_bytes // MAX_ENTRY_SHARE:
+                return response
+
+            bodies = __compress(body)
+            entry = Entry(
+                bodies,
+                [(name, value) for name, value in response.headers.items() if name in STORED_HEADERS],
+                sum(len(b) for b in bodies.values())
+            )
+
+            __store(key, version, entry)
+            return __respond(entry, False)
+
+        return wrapped
+
+    return wrapper
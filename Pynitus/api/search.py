@@ -0,0 +1,14 @@
+from Pynitus import app
+from Pynitus.api.encoders import TrackEncoder
+from Pynitus.api.request_util import expect, expect_optional, library_etag, response_format
+from Pynitus.api.response_cache import cached
+from Pynitus.model import search
+
+
+@app.route('/search', methods=['GET'])
+@library_etag()
+@cached()
+@expect(('q', str))
+@expect_optional(('offset', int), ('amount', int), ('format', response_format))
+def search_tracks(q=None, offset=0, amount=0, format="nested"):
+    return TrackEncoder(compound=format == "compound").encode(search.search(q, offset=offset, limit=amount))
@@ -0,0 +1,239 @@
+import json
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, String
+
+# Objects are encoded by plans, which are compiled once per model into a
+# %-format template and the list of attributes filling it. Encoding an
+# object then costs one lookup of all attributes, a converter call per
+# value and one string formatting, instead of building dicts and walking
+# them with json.
+#
+# Attributes are read from the instance dict, which bypasses the ORM's
+# attribute instrumentation. Attributes which aren't loaded yet are missing
+# from it, those objects are read through getattr, which loads them.
+# Nested objects, e.g. the album of a track, are encoded once per response,
+# since the tracks of a list often share them.
+#
+# Compound documents don't nest objects, but refer to them by their id, type
+# and follow url. Every referred object is included once, next to the data.
+#
+# The output is exactly that of json.dumps(plan.as_dict(o)).
+
+Converter = Callable[[Any], str]
+
+
+def encode_string(value) -> str:
+    return encode_basestring_ascii(value) if value is not None else "null"
+
+
+def template_literal(value: str) -> str:
+    # A JSON string, escaped for use in a %-format template
+    return encode_basestring_ascii(value).replace("%", "%%")
+
+
+class ListOf(object):
+    """
+    A field containing a list of objects, which are found by a function of an attribute.
+    """
+
+    def __init__(self, plan: 'Plan', find: Callable[[Any], Iterable[Any]]):
+        """
+        :param plan: The plan encoding the objects
+        :param find: Finds the objects by the value of the attribute, e.g. tracks.on_playlist
+        """
+        self.plan = plan
+        self.find = find
+
+    def encode(self, value) -> str:
+        return self.plan.encode_many(self.find(value))
+
+    def as_list(self, value) -> List[Dict[str, Any]]:
+        return [self.plan.as_dict(o) for o in self.find(value)]
+
+
+class Plan(object):
+    """
+    How objects of a model are encoded, as their id, type, follow url and data.
+    The data is described by fields, each of which is one of
+        (key, attribute): The value of the attribute
+        (key, attribute, Plan): The object in the attribute, encoded by the plan
+        (key, attribute, ListOf): The objects found by the value of the attribute
+    """
+
+    def __init__(self, model: type, type_name: str, follow: str, fields: List[Tuple]):
+        """
+        :param model: The class of the encoded objects
+        :param type_name: The type of the objects in the API
+        :param follow: The url of an object, without it's id
+        :param fields: The fields of the data
+        """
+        self.model = model
+        self.type_name = type_name
+        self.follow = follow
+        self.fields = fields
+
+        self.__compiled = {data: self.__compile(data) for data in [True, False]}
+
+    def __converter(self, attribute: str) -> Converter:
+
+        column = self.model.__table__.columns.get(attribute)
+
+        if column is not None and isinstance(column.type, Integer) and not column.nullable:
+            return str
+
+        if column is not None and isinstance(column.type, String):
+            return encode_string
+
+        return json.dumps
+
+    def __compile(self, data: bool) -> Tuple[str, Callable, Callable, List[Any]]:
+
+        # The follow url ends with the id, so it's closing quote comes after it's placeholder
+        template = '{"id": %s, "type": ' + template_literal(self.type_name) + \
+                   ', "follow": ' + template_literal(self.follow)[:-1] + '%s"'
+        attributes = ["id", "id"]
+        converters = [str, str]  # Nested plans are bound to the response they are encoded for, see __bind
+
+        if data:
+            items = []
+
+            for key, attribute, *encoding in self.fields:
+                encoding = encoding[0] if len(encoding) > 0 else None
+
+                if isinstance(encoding, ListOf):
+                    encoding = encoding.encode
+
+                items.append(template_literal(key) + ": %s")
+                attributes.append(attribute)
+                converters.append(encoding or self.__converter(attribute))
+
+            template += ', "data": {' + ", ".join(items) + "}"
+
+        return template + "}", itemgetter(*attributes), attrgetter(*attributes), converters
+
+    def __bind(self, data: bool, memo: Dict[Any, Dict[int, str]], included: Optional[List[str]]=None) -> Converter:
+
+        template, loaded, load, converters = self.__compiled[data]
+
+        if included is None:
+            converters = [c.__nested(memo) if isinstance(c, Plan) else c for c in converters]
+        else:
+            converters = [c.__reference(memo, included) if isinstance(c, Plan) else c for c in converters]
+
+        def encode(o) -> str:
+            try:
+                values = loaded(o.__dict__)
+            except KeyError:
+                values = load(o)
+
+            return template % tuple([convert(value) for convert, value in zip(converters, values)])
+
+        return encode
+
+    def __nested(self, memo: Dict[Any, Dict[int, str]]) -> Converter:
+
+        encode = self.__bind(True, memo)
+        encoded_objects = memo.setdefault(self, dict({}))
+
+        def encode_nested(o) -> str:
+            if o is None:
+                return "null"
+
+            # The objects outlive the response, so their ids aren't reused while it is encoded
+            key = id(o)
+            encoded = encoded_objects.get(key)
+
+            if encoded is None:
+                encoded = encoded_objects[key] = encode(o)
+
+            return encoded
+
+        return encode_nested
+
+    def __reference(self, memo: Dict[Any, Dict[int, str]], included: List[str]) -> Converter:
+
+        encode_reference = self.__bind(False, memo)
+        encode_included = self.__bind(True, memo, included)
+        references = memo.setdefault((self, "reference"), dict({}))
+
+        def encode_nested(o) -> str:
+            if o is None:
+                return "null"
+
+            key = id(o)
+            encoded = references.get(key)
+
+            if encoded is None:
+                encoded = references[key] = encode_reference(o)
+                included.append(encode_included(o))
+
+            return encoded
+
+        return encode_nested
+
+    def encode(self, o, data: bool=True) -> str:
+        """
+        :param o: An object of the model
+        :param data: Whether to include the data, or only the id, type and follow url
+        :return: The object as JSON
+        """
+        return self.__bind(data, dict({}))(o)
+
+    def encode_many(self, objects: Iterable[Any], data: bool=True) -> str:
+        """
+        :param objects: Objects of the model
+        :param data: Whether to include the data, or only the id, type and follow url
+        :return: The list of objects as JSON
+        """
+        return "[" + ", ".join(self.encode_each(objects, data)) + "]"
+
+    def encode_each(self, objects: Iterable[Any], data: bool=True) -> List[str]:
+        """
+        :param objects: Objects of the model, which have to be kept alive while they are encoded
+        :param data: Whether to include the data, or only the id, type and follow url
+        :return: Every object as JSON
+        """
+        encode = self.__bind(data, dict({}))
+        return [encode(o) for o in objects]
+
+    def encode_compound(self, objects: Iterable[Any]) -> str:
+        """
+        :param objects: Objects of the model
+        :return: The list of objects as a compound document, with the objects they refer to included once
+        """
+
+        included = []
+        encode = self.__bind(True, dict({}), included)
+        data = [encode(o) for o in objects]
+
+        return '{"data": [' + ", ".join(data) + '], "included": [' + ", ".join(included) + "]}"
+
+    def as_dict(self, o, data: bool=True) -> Dict[str, Any]:
+        """
+        :param o: An object of the model
+        :param data: Whether to include the data, or only the id, type and follow url
+        :return: The object as it is encoded, for embedding it into other responses
+        """
+
+        r = {'id': o.id, 'type': self.type_name, 'follow': self.follow + str(o.id)}
+
+        if not data:
+            return r
+
+        r['data'] = dict({})
+
+        for key, attribute, *encoding in self.fields:
+            value = getattr(o, attribute)
+            encoding = encoding[0] if len(encoding) > 0 else None
+
+            if isinstance(encoding, Plan):
+                value = encoding.as_dict(value) if value is not None else None
+            elif isinstance(encoding, ListOf):
+                value = encoding.as_list(value)
+
+            r['data'][key] = value
+
+        return r
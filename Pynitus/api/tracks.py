@@ -1,38 +1,71 @@
+from flask import json
+
 from Pynitus import app
 from Pynitus.api.encoders import TrackEncoder
-from Pynitus.api.request_util import expect_optional
+from Pynitus.api.request_util import expect_optional, decode_cursor, paged, stream_format, streamed, library_etag, \
+    response_format, Response
+from Pynitus.api.response_cache import cached
 
 from Pynitus.model import tracks
 
 
 @app.route('/tracks/all', methods=['GET'])
-@expect_optional(('offset', int), ('amount', int))
-def tracks_all(offset=0, amount=0):
-    return TrackEncoder().encode(tracks.all(offset=offset, limit=amount))
+@library_etag()
+@cached()
+@expect_optional(('offset', int), ('amount', int), ('cursor', decode_cursor), ('stream', stream_format),
+                 ('format', response_format))
+def tracks_all(offset=0, amount=0, cursor=None, stream=None, format="nested"):
+    if stream is not None:
+        if format == "compound":
+            return json.dumps({
+                'success': False,
+                'reason': Response.BAD_REQUEST
+            })
+
+        return streamed(TrackEncoder(), tracks.all(offset=offset, limit=amount, after=cursor, streamed=True), stream)
+
+    page = tracks.all(offset=offset, limit=amount, after=cursor)
+    return paged(TrackEncoder(compound=format == "compound").encode(page), page)
 
 
 @app.route('/tracks/unimported', methods=['GET'])
-@expect_optional(('offset', int), ('amount', int))
-def tracks_unimported(offset=0, amount=0):
-    return TrackEncoder().encode(tracks.unimported(offset=offset, limit=amount))
+@library_etag()
+@cached()
+@expect_optional(('offset', int), ('amount', int), ('cursor', decode_cursor), ('format', response_format))
+def tracks_unimported(offset=0, amount=0, cursor=None, format="nested"):
+    page = tracks.unimported(offset=offset, limit=amount, after=cursor)
+    return paged(TrackEncoder(compound=format == "compound").encode(page), page)
 
 
 @app.route('/tracks/unavailable', methods=['GET'])
-@expect_optional(('offset', int), ('amount', int))
-def tracks_unavailable(offset=0, amount=0):
-    return TrackEncoder().encode(tracks.unavailable(offset=offset, limit=amount))
+@library_etag()
+@cached()
+@expect_optional(('offset', int), ('amount', int), ('cursor', decode_cursor), ('format', response_format))
+def tracks_unavailable(offset=0, amount=0, cursor=None, format="nested"):
+    page = tracks.unavailable(offset=offset, limit=amount, after=cursor)
+    return paged(TrackEncoder(compound=format == "compound").encode(page), page)
 
 
 @app.route('/tracks/album/<int:album_id>', methods=['GET'])
-def tracks_album(album_id):
-    return TrackEncoder().encode(tracks.on_album(album_id))
+@library_etag()
+@cached()
+@expect_optional(('offset', int), ('amount', int), ('cursor', decode_cursor), ('format', response_format))
+def tracks_album(album_id, offset=0, amount=0, cursor=None, format="nested"):
+    page = tracks.on_album(album_id, offset=offset, limit=amount, after=cursor)
+    return paged(TrackEncoder(compound=format == "compound").encode(page), page)
 
 
 @app.route('/tracks/artist/<int:artist_id>', methods=['GET'])
-def tracks_artist(artist_id):
-    return TrackEncoder().encode(tracks.from_artist(artist_id))
+@library_etag()
+@cached()
+@expect_optional(('offset', int), ('amount', int), ('cursor', decode_cursor), ('format', response_format))
+def tracks_artist(artist_id, offset=0, amount=0, cursor=None, format="nested"):
+    page = tracks.from_artist(artist_id, offset=offset, limit=amount, after=cursor)
+    return paged(TrackEncoder(compound=format == "compound").encode(page), page)
 
 
 @app.route('/tracks/id/<int:track_id>', methods=['GET'])
+@library_etag()
+@cached()
 def tracks_id(track_id):
     return TrackEncoder().encode(tracks.get(track_id))
@@ -16,8 +16,8 @@
 
 import os
 
-import argon2
-
+from Pynitus.auth import tokens
+from Pynitus.auth.hashing import hash_password
 from Pynitus.framework.pubsub import pub
 from Pynitus.io import config
 from Pynitus.auth import user_cache
@@ -36,6 +36,7 @@ def authenticate(username: str, password: str) -> str:
     :param username: The user's username
     :param password: The user's password
     :return: The user's token
+    :raises HashingOverloaded: If too many logins are being processed at the moment
     """
     user = users.get(username)
 
@@ -43,15 +44,12 @@ def authenticate(username: str, password: str) -> str:
         del password
         return ""
 
-    hash_result = argon2.argon2_hash(password, user.password_salt)
+    hash_result = hash_password(password, user.password_salt)
     del password
 
     if hash_result == user.password_hash:
 
-        user_token = os.urandom(64).hex()
-        while user_cache.exists(user_token):
-            user_token = os.urandom(64).hex()
-
+        user_token = __new_token(username, user.privilege_level)
         pub('user_authenticated', user_token, username, user.privilege_level, config.get('user_ttl'))
         return user_token
 
@@ -68,22 +66,47 @@ def register(username: str, password: str, privilege_level: int) -> bool:
     :param password: The new user's password
     :param privilege_level: The new user's privilege level
     :return: Whether the new user was registered or not
+    :raises HashingOverloaded: If too many logins are being processed at the moment
     """
 
-    password_salt = os.urandom(512)
-    password_hashed = argon2.argon2_hash(password, password_salt)
-    del password
-
     if users.get(username) is not None:
+        del password
         return False
 
+    password_salt = os.urandom(512)
+    password_hashed = hash_password(password, password_salt)
+    del password
+
     user = users.create(username, password_hashed, password_salt)
     with persistance():
         user.privilege_level = privilege_level
 
+    user_token = __new_token(username, user.privilege_level)
+    pub('user_authenticated', user_token, username, user.privilege_level, config.get('user_ttl'))
+    return True
+
+
+def logout(user_token: str) -> bool:
+    """
+    Ends the session of a user.
+    :param user_token: The user's token
+    :return: Whether the session was ended
+    """
+    return user_cache.invalidate(user_token)
+
+
+def __new_token(username: str, privilege_level: int) -> str:
+    """
+    :param username: The user's username
+    :param privilege_level: The user's privilege level
+    :return: A new user token, signed if signed tokens are enabled
+    """
+
+    if tokens.enabled():
+        return tokens.issue(username, privilege_level, config.get('user_ttl'))
+
     user_token = os.urandom(64).hex()
     while user_cache.exists(user_token):
         user_token = os.urandom(64).hex()
 
-    pub('user_authenticated', user_token, username, user.privilege_level, config.get('user_ttl'))
-    return True
+    return user_token
@@ -0,0 +1,99 @@
+"""
+    Pynitus - A free and democratic music playlist
+    Copyright (C) 2017  Noah Hummel
+    This file is part of the Pynitus program, see <https://github.com/strangedev/Pynitus>.
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import Any, Dict, Optional
+
+from Pynitus.auth import user_cache
+from Pynitus.model import users
+from Pynitus.model.db.models import User
+
+
+class AuthContext(object):
+    """
+    The user on whose behalf a request is performed.
+    One instance is created per request and kept in flask.g.auth.
+    The user's session is looked up when it's needed for the first time,
+    all later checks during the same request are answered from memory.
+    """
+
+    def __init__(self, user_token: str):
+        self.user_token = user_token
+        self.__session = None  # type: Optional[Dict[str, Any]]
+        self.__session_resolved = False
+        self.__user = None  # type: Optional[User]
+        self.__user_resolved = False
+
+    @property
+    def session(self) -> Optional[Dict[str, Any]]:
+        """
+        :return: The session record of the user or None, if there is no valid session
+        """
+        if not self.__session_resolved:
+            self.__session = user_cache.session(self.user_token)
+            self.__session_resolved = True
+
+        return self.__session
+
+    @property
+    def authenticated(self) -> bool:
+        """
+        :return: Whether the request was made by a logged in user
+        """
+        return self.session is not None
+
+    @property
+    def username(self) -> str:
+        """
+        :return: The username of the user or an empty string, if the user isn't logged in
+        """
+        return self.session['username'] if self.authenticated else ""
+
+    @property
+    def privilege_level(self) -> int:
+        """
+        :return: The privilege level of the user, 0 if the user isn't logged in
+        """
+        return self.session['privilege_level'] if self.authenticated else 0
+
+    @property
+    def user(self) -> Optional[User]:
+        """
+        :return: The database record of the user or None, if the user isn't logged in
+        """
+        if not self.__user_resolved:
+            self.__user = users.get(self.username) if self.authenticated else None
+            self.__user_resolved = True
+
+        return self.__user
+
+    def authorize(self, required_privilege: int) -> bool:
+        """
+        Used to check whether the user is permitted to perform a certain action.
+        :param required_privilege: The required privilege level to perform the action
+        :return: Whether the user is permitted to perform the action
+        """
+
+        if required_privilege < 1:
+            return True
+
+        return self.authenticated and self.privilege_level >= required_privilege
+
+    def owns(self, o: Any) -> bool:
+        """
+        :param o: An object with an owner, such as a Playlist
+        :return: Whether the user is logged in and the owner of the object
+        """
+        return self.authenticated and getattr(o, 'username', None) == self.username
@@ -0,0 +1,82 @@
+"""
+    Pynitus - A free and democratic music playlist
+    Copyright (C) 2017  Noah Hummel
+    This file is part of the Pynitus program, see <https://github.com/strangedev/Pynitus>.
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union
+
+import argon2
+
+from Pynitus.io import config
+
+# Password hashing is expensive on purpose. It runs in a separate pool of
+# processes, so that a burst of logins occupies the CPU cores, but not the
+# threads which serve all other requests. Only a limited number of hashes may
+# be running or waiting at any time, further requests are turned away at once.
+
+__executor = None
+__admission = None
+__lock = threading.Lock()
+
+
+class HashingOverloaded(Exception):
+    """
+    Raised if there are already too many passwords waiting to be hashed.
+    """
+    pass
+
+
+def __init_pool() -> None:
+    global __executor, __admission
+
+    with __lock:
+        if __executor is not None:
+            return
+
+        workers = config.get('hash_workers') or os.cpu_count() or 1
+        queue_size = config.get('hash_queue_size') or 0
+
+        __admission = threading.BoundedSemaphore(workers + queue_size)
+
+        # Forking a multi-threaded server is unsafe, so the workers are spawned.
+        # Besides argon2, a spawned worker imports the main module of the server
+        # process again (without running its __main__ block). With flask run,
+        # that is flask's command line script, which doesn't import Pynitus.
+        __executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def hash_password(password: Union[str, bytes], salt: bytes) -> bytes:
+    """
+    Hashes a password using argon2 in one of the hashing processes.
+    Blocks until the hash was computed.
+    :param password: The password
+    :param salt: The salt
+    :return: The hashed password
+    :raises HashingOverloaded: If the hashing processes can't keep up with the requests
+    """
+
+    if __executor is None:
+        __init_pool()
+
+    if not __admission.acquire(blocking=False):
+        raise HashingOverloaded()
+
+    try:
+        return __executor.submit(argon2.argon2_hash, password, salt).result()
+    finally:
+        __admission.release()
@@ -0,0 +1,112 @@
+"""
+    Pynitus - A free and democratic music playlist
+    Copyright (C) 2017  Noah Hummel
+    This file is part of the Pynitus program, see <https://github.com/strangedev/Pynitus>.
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import threading
+import time
+
+from flask import current_app
+
+from Pynitus.auth import user_cache
+from Pynitus.framework.pubsub import sub, pub
+from Pynitus.util.timing_wheel import TimingWheel
+
+# Every process keeps a timing wheel with the sessions that were opened in it,
+# ordered by the time they expire at if the user stays inactive.
+# Once a session is due, the reaper checks whether there was activity in the
+# meantime. If so, the session is put back into the wheel, otherwise
+# user_expired is published.
+
+RESOLUTION = 1.0  # Seconds between two turns of the wheel
+
+__wheel = TimingWheel(time.time(), RESOLUTION)
+__lock = threading.Lock()
+__thread = None
+
+
+def init_reaper():
+    """
+    Should be called once on server startup.
+    :return: None
+    """
+    sub('user_authenticated', user_authenticated)
+
+
+def user_authenticated(user_token: str, username: str, privilege_level: int, ttl: int) -> None:
+    """
+    » Subscribed to user_authenticated
+    Schedules the new session to be checked once it would expire.
+    :param user_token: The user token of the user who just authenticated themselves
+    :param username: The username token of the user who just authenticated themselves
+    :param privilege_level: The privilege level of the user who just authenticated themselves
+    :param ttl: The ttl of the session
+    :return: None
+    """
+
+    record = user_cache.session(user_token)
+    deadline = user_cache.expires(record) if record is not None else time.time() + ttl
+
+    with __lock:
+        __wheel.schedule(user_token, deadline)
+
+    __start(current_app._get_current_object())
+
+
+def __start(app) -> None:
+    global __thread
+
+    with __lock:
+        if __thread is not None:
+            return
+
+        __thread = threading.Thread(target=__run, args=(app,), name="pynitus-reaper", daemon=True)
+        __thread.start()
+
+
+def __run(app) -> None:
+
+    while True:
+        time.sleep(RESOLUTION)
+
+        try:
+            with app.app_context():
+                reap()
+        except Exception as e:
+            # TODO: log error
+            print("Reaper: Sessions could not be reaped, because {}".format(e))
+
+
+def reap() -> None:
+    """
+    Publishes user_expired for every session that expired since the last call.
+    :return: None
+    """
+
+    with __lock:
+        due = __wheel.advance(time.time())
+
+    if len(due) == 0:
+        return
+
+    alive = user_cache.sessions(due)
+
+    for user_token in due:
+        record = alive.get(user_token)
+
+        if record is not None:
+            with __lock:
+                __wheel.schedule(user_token, user_cache.expires(record))
+        else:
+            pub('user_expired', user_token)
@@ -0,0 +1,179 @@
+"""
+    Pynitus - A free and democratic music playlist
+    Copyright (C) 2017  Noah Hummel
+    This file is part of the Pynitus program, see <https://github.com/strangedev/Pynitus>.
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from Pynitus.framework import memcache
+from Pynitus.io import config
+
+# Signed tokens carry the username, privilege level and expiry of a session,
+# signed with the token_secret from the config. They can be verified by any
+# process knowing the secret, without looking up the session.
+# They can't be refreshed, so they expire user_ttl seconds after login.
+#
+# Tokens which are invalidated before they expire (e.g. by logging out) are
+# kept in a revocation list in memcached. Every process keeps a copy of it,
+# which is refreshed at most every REVOCATION_REFRESH seconds.
+
+REVOCATION_REFRESH = 5
+CAS_RETRIES = 8
+
+# The payload and its SHA-256 signature, both base64url encoded without padding
+TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_-]+\.[A-Za-z0-9_-]{43}')
+
+__revoked = dict({})  # type: Dict[str, float]
+__revoked_fetched = 0.0
+__lock = threading.Lock()
+
+
+def __encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def __decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def __get_secret() -> bytes:
+    return (config.get('token_secret') or "").encode()
+
+
+def __sign(payload: str) -> str:
+    return __encode(hmac.new(__get_secret(), payload.encode(), hashlib.sha256).digest())
+
+
+def __signature(user_token: str) -> str:
+    return user_token.rpartition('.')[2]
+
+
+def __revocations() -> Dict[str, float]:
+    global __revoked, __revoked_fetched
+
+    if time.time() - __revoked_fetched > REVOCATION_REFRESH:
+        with __lock:
+            __revoked = memcache.get("tokens.revoked") or dict({})
+            __revoked_fetched = time.time()
+
+    return __revoked
+
+
+def enabled() -> bool:
+    """
+    :return: Whether new user tokens should be signed tokens
+    """
+    return bool(config.get('signed_tokens')) and len(__get_secret()) > 0
+
+
+def is_signed(user_token: str) -> bool:
+    """
+    :param user_token: A user token
+    :return: Whether the user token is a signed token. The signature isn't checked.
+    """
+    return user_token is not None and TOKEN_PATTERN.fullmatch(user_token) is not None
+
+
+def issue(username: str, privilege_level: int, ttl: int) -> str:
+    """
+    Creates a signed user token.
+    :param username: The username of the user
+    :param privilege_level: The privilege level of the user
+    :param ttl: The number of seconds after which the token expires
+    :return: The user token
+    """
+
+    payload = __encode(json.dumps([
+        username,
+        privilege_level,
+        int(time.time()) + ttl,
+        os.urandom(8).hex()  # makes two tokens issued for the same user at once distinct
+    ]).encode())
+
+    return payload + '.' + __sign(payload)
+
+
+def verify(user_token: str) -> Optional[Dict[str, Any]]:
+    """
+    Checks the signature and expiry of a signed user token.
+    :param user_token: A signed user token
+    :return: The session record (username, privilege_level, expires) contained in the token,
+             or None if the token is invalid, expired or revoked
+    """
+
+    if not is_signed(user_token):
+        return None
+
+    payload, _, signature = user_token.rpartition('.')
+
+    if len(__get_secret()) == 0 or not hmac.compare_digest(signature.encode(), __sign(payload).encode()):
+        return None
+
+    try:
+        username, privilege_level, expires, _ = json.loads(__decode(payload).decode())
+    except Exception:
+        return None
+
+    if time.time() > expires or signature in __revocations():
+        return None
+
+    return {
+        'username': username,
+        'privilege_level': privilege_level,
+        'expires': expires
+    }
+
+
+def revoke(user_token: str) -> bool:
+    """
+    Invalidates a signed user token before it expires.
+    :param user_token: A signed user token
+    :return: Whether the revocation was stored, False if other revocations kept interfering
+             and the token is only revoked in this process
+    """
+
+    record = verify(user_token)
+
+    if record is None:
+        return True
+
+    signature = __signature(user_token)
+    now = time.time()
+
+    with __lock:
+        __revoked[signature] = record['expires']
+
+    for _ in range(CAS_RETRIES):
+        revoked = memcache.gets("tokens.revoked")
+
+        if revoked is None:
+            if memcache.add("tokens.revoked", {signature: record['expires']}):
+                return True
+            continue
+
+        revoked = {s: expires for s, expires in revoked.items() if expires > now}
+        revoked[signature] = record['expires']
+
+        if memcache.cas("tokens.revoked", revoked):
+            return True
+
+    return False
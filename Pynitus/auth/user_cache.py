@@ -14,10 +14,110 @@
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import hashlib
+import threading
 import time
+from typing import Optional, Dict, Any, Iterable
 
+from Pynitus.auth import tokens
 from Pynitus.framework import memcache
-from Pynitus.framework.pubsub import sub
+from Pynitus.framework.pubsub import sub, dispatch_async
+from Pynitus.io import config
+
+CAS_RETRIES = 8
+
+# Every session is stored under its own key, so that reading or refreshing
+# one session never touches the others. Memcached expires the sessions on its
+# own once their ttl has passed without activity.
+# The user index maps a username to the token of its current session.
+# It isn't expired, an entry pointing at an expired session is harmless.
+
+# Activity is buffered in process and written back in batches. A batch is
+# written by a timer, half of user_activity_interval after its first activity,
+# so no request is needed to trigger it. Sessions are granted that interval as
+# grace time, so they don't expire while their latest activity is still buffered.
+__pending_activity = dict({})  # type: Dict[str, float]
+__pending_lock = threading.Lock()
+__flush_timer = None  # type: Optional[threading.Timer]
+
+
+def __key(prefix: str, value: str) -> str:
+    # Tokens and usernames are user input and may not be valid memcached keys.
+    return prefix + hashlib.sha1(value.encode()).hexdigest()
+
+
+def __session_key(user_token: str) -> str:
+    return __key("user_cache.session.", user_token)
+
+
+def __user_key(username: str) -> str:
+    return __key("user_cache.user.", username)
+
+
+def __grace() -> int:
+    return max(config.get('user_activity_interval') or 0, 0)
+
+
+def __expired(record: Dict[str, Any]) -> bool:
+    return time.time() > expires(record)
+
+
+def session(user_token: str) -> Optional[Dict[str, Any]]:
+    """
+    :param user_token: A user token
+    :return: The session record of the user or None, if there is no valid session.
+             The record contains at least the username and privilege_level.
+    """
+
+    if user_token is None:
+        return None
+
+    if tokens.is_signed(user_token):
+        return tokens.verify(user_token)
+
+    record = memcache.get(__session_key(user_token))
+
+    if record is None or __expired(record):
+        return None
+
+    return record
+
+
+def sessions(user_tokens: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Looks up several sessions at once.
+    :param user_tokens: Some user tokens
+    :return: The session record of every user token with a valid session
+    """
+
+    result = dict({})
+    keys = dict({})
+
+    for user_token in user_tokens:
+        if tokens.is_signed(user_token):
+            record = tokens.verify(user_token)
+            if record is not None:
+                result[user_token] = record
+        else:
+            keys[__session_key(user_token)] = user_token
+
+    for key, record in memcache.get_multi(keys.keys()).items():
+        if not __expired(record):
+            result[keys[key]] = record
+
+    return result
+
+
+def expires(record: Dict[str, Any]) -> float:
+    """
+    :param record: A session record
+    :return: The time at which the session expires if the user stays inactive
+    """
+
+    if 'expires' in record:
+        return record['expires']
+
+    return record['last_seen'] + record['ttl'] + record.get('grace', __grace())
 
 
 def init_user_cache():
@@ -26,8 +126,8 @@ def init_user_cache():
     Initializes the persistent cache.
     :return: None
     """
-    memcache.set("user_cache.active_users", dict({}))
     sub('user_activity', activity)
+    dispatch_async('user_activity')
     sub('user_authenticated', user_authenticated)
 
 
@@ -36,29 +136,70 @@ def activity(user_token: str) -> None:
     » Subscribed to user_activity
     Refreshes the last_seen attribute of the user with the given user_token.
     Also invalidates the user's session if the ttl has expired.
+    If user_activity_interval is configured, the refresh is buffered and
+    written back together with the activity of other users later on.
     :param user_token: The user token of the active user
     :return: None
     """
+    global __flush_timer
+
+    if tokens.is_signed(user_token):
+        return  # signed tokens expire at a fixed time
+
+    interval = config.get('user_activity_interval') or 0
+
+    if interval <= 0:
+        __refresh(user_token, time.time())
+        return
+
+    with __pending_lock:
+        __pending_activity[user_token] = time.time()
+
+        if __flush_timer is None:
+            __flush_timer = threading.Timer(interval / 2, flush_activity)
+            __flush_timer.daemon = True
+            __flush_timer.start()
+
+
+def flush_activity() -> None:
+    """
+    Writes back the buffered activity of all users.
+    :return: None
+    """
+    global __flush_timer
 
-    active_users = memcache.get("user_cache.active_users")
-    record = active_users.get(user_token)
+    with __pending_lock:
+        pending = dict(__pending_activity)
+        __pending_activity.clear()
+        __flush_timer = None
+
+    for user_token, last_seen in pending.items():
+        __refresh(user_token, last_seen)
+
+
+def __refresh(user_token: str, last_seen: float) -> None:
+
+    key = __session_key(user_token)
+    record = memcache.gets(key)
 
     if record is None:
         return
 
-    if time.time() - record['last_seen'] > record['ttl']:
-        del active_users[user_token]
-        memcache.set("user_cache.active_users", active_users)
+    if __expired(record):
+        memcache.delete(key)
         return
 
-    active_users[user_token]['last_seen'] = time.time()
-    memcache.set("user_cache.active_users", active_users)
+    record['last_seen'] = max(record['last_seen'], last_seen)
+
+    # Fails if the session was replaced or deleted in the meantime, which must not be undone here.
+    memcache.cas(key, record, time=record['ttl'] + record.get('grace', __grace()))
 
 
 def user_authenticated(user_token: str, username: str, privilege_level: int, ttl: int) -> None:
     """
     » Subscribed to user_authenticated
     Populates the cache with info about the user.
+    Sessions which the user opened before are invalidated.
     :param user_token: The user token of the user who just authenticated themselves
     :param username: The username token of the user who just authenticated themselves
     :param privilege_level: The privilege level of the user who just authenticated themselves
@@ -67,24 +208,49 @@ def user_authenticated(user_token: str, username: str, privilege_level: int, ttl
     """
     # print(username, "authenticated.")  # TODO: log event
 
-    active_users = memcache.get("user_cache.active_users")
-    active_users[user_token] = {
-        'last_seen': time.time(),
-        'username': username,
-        'privilege_level': privilege_level,
-        'ttl': ttl
-    }
+    if not tokens.is_signed(user_token):
+        grace = __grace()
+
+        memcache.set(__session_key(user_token), {
+            'last_seen': time.time(),
+            'username': username,
+            'privilege_level': privilege_level,
+            'ttl': ttl,
+            'grace': grace
+        }, time=ttl + grace)
 
-    old_sessions = []
+    user_key = __user_key(username)
+    old_token = None
 
-    for token, record in active_users.items():
-        if record['username'] == username and token != user_token:
-            old_sessions.append(token)
+    for _ in range(CAS_RETRIES):
+        old_token = memcache.gets(user_key)
 
-    for token in old_sessions:
-        del active_users[token]
+        if old_token is None:
+            stored = memcache.add(user_key, user_token)
+        else:
+            stored = memcache.cas(user_key, user_token)
 
-    memcache.set("user_cache.active_users", active_users)
+        if stored:
+            break
+    else:
+        memcache.set(user_key, user_token)
+
+    if old_token is not None and old_token != user_token:
+        invalidate(old_token)
+
+
+def invalidate(user_token: str) -> bool:
+    """
+    Ends the session of a user, e.g. because they logged out.
+    :param user_token: The user token of the user
+    :return: Whether the session was ended in all server processes
+    """
+
+    if tokens.is_signed(user_token):
+        return tokens.revoke(user_token)
+
+    memcache.delete(__session_key(user_token))
+    return True
 
 
 def exists(user_token: str) -> bool:
@@ -92,7 +258,7 @@ def exists(user_token: str) -> bool:
     :param user_token: A user token
     :return: Whether the user token exists in the cache
     """
-    return memcache.get("user_cache.active_users").get(user_token) is not None
+    return session(user_token) is not None
 
 
 def whois(user_token: str) -> str:
@@ -100,7 +266,7 @@ def whois(user_token: str) -> str:
     :param user_token: A user token
     :return: The username of the user with the given token
     """
-    record = memcache.get("user_cache.active_users").get(user_token)
+    record = session(user_token)
 
     if record is None:
         return ""
@@ -119,15 +285,9 @@ def authorize(user_token: str, required_privilege: int) -> bool:
     if required_privilege < 1:
         return True
 
-    record = memcache.get("user_cache.active_users").get(user_token)
+    record = session(user_token)
 
     if record is None:
         return False
 
-    if time.time() - record['last_seen'] > record['ttl']:
-        active_users = memcache.get("user_cache.active_users")
-        del active_users[user_token]
-        memcache.set("user_cache.active_users", active_users)
-        return False
-
     return record['privilege_level'] >= required_privilege
@@ -14,20 +14,118 @@
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from typing import Any
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
 
-from flask import g
 import memcache
 
+SERVERS = ['127.0.0.1']
 
-def get_memcache():
+# Connections to memcached are kept in a pool and shared by all threads,
+# so they stay open across requests. Connections are opened on demand until
+# the pool size is reached, after that threads wait for one to be returned.
+# Connections beyond a reduced pool size are closed instead of being returned.
+# The pool doesn't depend on flask, it can be used outside of requests.
+#
+# memcache.Client keeps its connections per thread. Every thread therefore
+# uses its own client, which is handed the borrowed connections.
+
+__client = memcache.Client(SERVERS, debug=0, cache_cas=True)
+__pool = queue.LifoQueue()
+__pool_size = 8
+__created = 0
+__lock = threading.Lock()
+
+# Versions of values retrieved by gets(), by thread. The connection which is
+# used for cas() may not be the one which performed the gets().
+__cas_ids = threading.local()
+
+
+def init_memcache(pool_size: Optional[int]) -> None:
+    """
+    Sets the number of connections to memcached a process may open.
+    :param pool_size: The maximum number of connections in the pool, None keeps the default
+    :return: None
+    """
+    global __pool_size
+
+    if pool_size is not None:
+        __pool_size = max(pool_size, 1)
+
+    # Idle connections beyond the pool size are closed now, those in use once they are returned
+    while True:
+        try:
+            servers = __pool.get_nowait()
+        except queue.Empty:
+            return
+
+        if not __release(servers):
+            return
+
+
+def __acquire():
+    global __created
+
+    try:
+        return __pool.get_nowait()
+    except queue.Empty:
+        pass
+
+    with __lock:
+        create = __created < __pool_size
+        if create:
+            __created += 1
+
+    if create:
+        return memcache.Client(SERVERS, debug=0).servers
+
+    return __pool.get()
+
+
+def __release(servers) -> bool:
+    global __created
+
+    with __lock:
+        close = __created > __pool_size
+        if close:
+            __created -= 1
+
+    if not close:
+        __pool.put(servers)
+        return False
+
+    for server in servers:
+        server.close_socket()
+
+    return True
+
+
+@contextmanager
+def client():
     """
-    :return: A memcached client which is persistent throughout a request
+    Borrows connections from the pool for the duration of the with block
+    :return: A memcached client using the borrowed connections
     """
-    mc = getattr(g, '_memcache_client', None)
-    if mc is None:
-        mc = g._memcache_client = memcache.Client(['127.0.0.1'], debug=0)
-    return mc
+    servers = __acquire()
+
+    try:
+        __client.servers = servers
+        __client._init_buckets()
+        yield __client
+    finally:
+        __release(servers)
+
+
+def __pending_cas_ids() -> Dict[str, Any]:
+
+    cas_ids = getattr(__cas_ids, 'ids', None)
+
+    if cas_ids is None:
+        cas_ids = __cas_ids.ids = dict({})
+
+    return cas_ids
 
 
 def get(key: str) -> Any:
@@ -36,17 +134,92 @@ def get(key: str) -> Any:
     :param key: The key of the value to retrieve
     :return: The value
     """
-    return get_memcache().get(key)
+    with client() as mc:
+        return mc.get(key)
 
 
-def set(key: str, value: Any) -> int:
+def set(key: str, value: Any, time: int=0) -> int:
     """
     Sets a value in memcached
     :param key: The key of the value to set
     :param value: The value
+    :param time: Seconds after which memcached expires the value, 0 means never
+    :return: Whether the action was successful
+    """
+    with client() as mc:
+        return mc.set(key, value, time=time)
+
+
+def get_multi(keys: Iterable[str]) -> Dict[str, Any]:
+    """
+    Gets several values from memcached in a single round trip
+    :param keys: The keys of the values to retrieve
+    :return: A dict of all keys which were found and their values
+    """
+    with client() as mc:
+        return mc.get_multi(list(keys))
+
+
+def add(key: str, value: Any, time: int=0) -> int:
+    """
+    Sets a value in memcached, but only if the key doesn't exist yet
+    :param key: The key of the value to set
+    :param value: The value
+    :param time: Seconds after which memcached expires the value, 0 means never
+    :return: Whether the value was stored
+    """
+    with client() as mc:
+        return mc.add(key, value, time=time)
+
+
+def delete(key: str) -> int:
+    """
+    Deletes a value from memcached
+    :param key: The key of the value to delete
     :return: Whether the action was successful
     """
-    return get_memcache().set(key, value)
+    with client() as mc:
+        return mc.delete(key)
+
+
+def gets(key: str) -> Any:
+    """
+    Gets a value from memcached and remembers its version for a following cas()
+    by the same thread
+    :param key: The key of the value to retrieve
+    :return: The value
+    """
+    with client() as mc:
+        value = mc.gets(key)
+        cas_id = mc.cas_ids.pop(key, None)
+
+    if cas_id is not None:
+        __pending_cas_ids()[key] = cas_id
+
+    return value
+
+
+def cas(key: str, value: Any, time: int=0) -> int:
+    """
+    Sets a value in memcached, but only if it wasn't changed since it was
+    retrieved using gets() by the same thread. If the value wasn't retrieved
+    using gets(), this behaves like set().
+    :param key: The key of the value to set
+    :param value: The value
+    :param time: Seconds after which memcached expires the value, 0 means never
+    :return: Whether the value was stored
+    """
+    cas_id = __pending_cas_ids().pop(key, None)
+
+    with client() as mc:
+        if cas_id is None:
+            return mc.set(key, value, time=time)
+
+        mc.cas_ids[key] = cas_id
+        try:
+            return mc.cas(key, value, time=time)
+        finally:
+            mc.cas_ids.pop(key, None)
 
 
 def incr(key: str) -> Any:
@@ -55,7 +228,8 @@ def incr(key: str) -> Any:
     :param key: The key of the value to increase
     :return: Whether the action was successful
     """
-    return get_memcache().incr(key)
+    with client() as mc:
+        return mc.incr(key)
 
 
 def decr(key: str) -> Any:
@@ -64,4 +238,5 @@ def decr(key: str) -> Any:
     :param key: The key of the value to decrease
     :return: Whether the action was successful
     """
-    return get_memcache().decr(key)
+    with client() as mc:
+        return mc.decr(key)
@@ -14,10 +14,84 @@
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from typing import Callable
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple, Any
+
+from flask import current_app, has_app_context
 
 from Pynitus.framework import memcache
 
+DROP = "drop"
+BLOCK = "block"
+
+ASYNC_WORKERS = 4  # Size of the thread pool shared by all asynchronous topics
+ASYNC_BATCH = 64  # Events handled per topic before the worker is handed back to the pool
+
+# The subscriber table lives in process memory. Every topic maps to an
+# immutable tuple of subscribers which is rebuilt whenever someone subscribes,
+# so pub() only needs a single dict lookup and never takes a lock.
+__dispatch = dict({})  # type: Dict[str, Tuple[Callable, ...]]
+__async_topics = dict({})  # type: Dict[str, AsyncTopic]
+__lock = threading.Lock()
+__loaded = False
+__executor = None
+
+
+class AsyncTopic(object):
+    """
+    Delivery state of a topic whose subscribers run on the worker pool.
+    Events are handed to the subscribers in the order they were published,
+    because at most one worker drains a topic at any time.
+    """
+
+    def __init__(self, max_pending: int, policy: str):
+        self.max_pending = max_pending
+        self.policy = policy
+        self.pending = deque()
+        self.draining = False
+        self.condition = threading.Condition()
+
+        self.queued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+
+
+def __load():
+    """
+    Fills the local subscriber table from memcached.
+    The table is written to memcached whenever someone subscribes, so that
+    processes which did not run the initialization themselves still know
+    about all subscribers. This happens at most once per process.
+    :return: None
+    """
+    global __dispatch, __async_topics, __loaded
+
+    with __lock:
+        if __loaded:
+            return
+
+        topics = memcache.get("pubsub.topics") or dict({})
+        __dispatch = {topic: tuple(subscribers) for topic, subscribers in topics.items()}
+
+        async_topics = memcache.get("pubsub.async_topics") or dict({})
+        __async_topics = {topic: AsyncTopic(*options) for topic, options in async_topics.items()}
+
+        __loaded = True
+
+
+def __get_executor() -> ThreadPoolExecutor:
+    global __executor
+
+    if __executor is None:
+        with __lock:
+            if __executor is None:
+                __executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS)
+
+    return __executor
+
 
 def init_pubsub():
     """
@@ -25,7 +99,15 @@ def init_pubsub():
     Initializes the persistent cache.
     :return: None
     """
+    global __dispatch, __async_topics, __loaded
+
+    with __lock:
+        __dispatch = dict({})
+        __async_topics = dict({})
+        __loaded = True
+
     memcache.set("pubsub.topics", dict({}))
+    memcache.set("pubsub.async_topics", dict({}))
 
 
 def sub(topic: str, subscriber: Callable) -> None:
@@ -36,14 +118,151 @@ def sub(topic: str, subscriber: Callable) -> None:
     :return: None
     """
 
-    topics = memcache.get("pubsub.topics")
+    global __dispatch
 
-    if topics.get(topic) is not None:
-        topics[topic].append(subscriber)
-    else:
-        topics[topic] = [subscriber]
+    if not __loaded:
+        __load()
 
-    memcache.set("pubsub.topics", topics)
+    with __lock:
+        dispatch = dict(__dispatch)
+        dispatch[topic] = dispatch.get(topic, ()) + (subscriber,)
+        __dispatch = dispatch
+
+    memcache.set("pubsub.topics", {t: list(s) for t, s in dispatch.items()})
+
+
+def dispatch_async(topic: str, max_pending: int=1024, policy: str=DROP) -> None:
+    """
+    Makes publishing to a topic non-blocking.
+    Instead of being called by the publisher, the subscribers of the topic
+    are run on a bounded pool of worker threads, in the order the data was published.
+    Only use this for fire-and-forget topics, the publisher can't know
+    whether or when the data was handled.
+    :param topic: The topic to publish asynchronously
+    :param max_pending: How many events may wait for delivery at most
+    :param policy: What to do when max_pending is exceeded, either DROP the new event
+                   or BLOCK the publisher until there is room again
+    :return: None
+    """
+
+    global __async_topics
+
+    if not __loaded:
+        __load()
+
+    with __lock:
+        async_topics = dict(__async_topics)
+        async_topics[topic] = AsyncTopic(max_pending, policy)
+        __async_topics = async_topics
+
+    memcache.set("pubsub.async_topics", {t: (a.max_pending, a.policy) for t, a in async_topics.items()})
+
+
+def subscribers(topic: str) -> Tuple[Callable, ...]:
+    """
+    :param topic: A topic
+    :return: All methods subscribed to the topic, in order of subscription
+    """
+
+    if not __loaded:
+        __load()
+
+    return __dispatch.get(topic, ())
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """
+    :return: The number of queued, processed, failed and dropped events
+             as well as the current backlog for every asynchronous topic
+    """
+
+    if not __loaded:
+        __load()
+
+    return {topic: {
+        'queued': a.queued,
+        'processed': a.processed,
+        'failed': a.failed,
+        'dropped': a.dropped,
+        'pending': len(a.pending)
+    } for topic, a in __async_topics.items()}
+
+
+def __deliver(topic: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> bool:
+    """
+    Calls all subscribers of the topic with the published data.
+    :return: Whether all subscribers handled the data without raising
+    """
+
+    success = True
+
+    for s in __dispatch.get(topic, ()):
+        try:
+            s(*args, **kwargs)
+        except Exception as e:
+            # TODO: log error
+            print("Pubsub: Data on {} could not be published to {}, because {}".format(topic, s, e))
+            success = False
+
+    return success
+
+
+def __drain(topic: str, a: AsyncTopic) -> None:
+    """
+    Runs on the worker pool.
+    Delivers up to ASYNC_BATCH pending events of a topic, then resubmits
+    itself if there is more work, so that busy topics can't starve the others.
+    :return: None
+    """
+
+    for _ in range(ASYNC_BATCH):
+
+        with a.condition:
+            if len(a.pending) == 0:
+                a.draining = False
+                return
+
+            app, args, kwargs = a.pending.popleft()
+            a.condition.notify_all()
+
+        if app is not None:
+            with app.app_context():
+                success = __deliver(topic, args, kwargs)
+        else:
+            success = __deliver(topic, args, kwargs)
+
+        if success:
+            a.processed += 1
+        else:
+            a.failed += 1
+
+    __get_executor().submit(__drain, topic, a)
+
+
+def __enqueue(topic: str, a: AsyncTopic, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> None:
+
+    # Subscribers may need the app context (e.g. for memcached), so it is handed to the worker.
+    app = current_app._get_current_object() if has_app_context() else None
+
+    with a.condition:
+
+        if a.policy == BLOCK:
+            while len(a.pending) >= a.max_pending:
+                a.condition.wait()
+
+        elif len(a.pending) >= a.max_pending:
+            a.dropped += 1
+            return
+
+        a.pending.append((app, args, kwargs))
+        a.queued += 1
+
+        if a.draining:
+            return
+
+        a.draining = True
+
+    __get_executor().submit(__drain, topic, a)
 
 
 def pub(topic: str, *args, **kwargs) -> None:
@@ -53,18 +272,21 @@ def pub(topic: str, *args, **kwargs) -> None:
     published data is handed over. Make sure that all subscribers can handle
     the published data in their method definition.
     Use keyword args when published data is heterogeneous.
+    If the topic is dispatched asynchronously, pub returns before the
+    subscribers are called.
     :param topic: The topic to publish to
     :param args: All non positional args
     :param kwargs: All keyword args
     :return: None
     """
 
-    subscribers = memcache.get("pubsub.topics").get(topic)
+    if not __loaded:
+        __load()
+
+    a = __async_topics.get(topic)
+
+    if a is not None:
+        __enqueue(topic, a, args, kwargs)
+        return
 
-    if subscribers is not None:
-        for s in subscribers:
-            try:
-                s(*args, **kwargs)
-            except Exception as e:
-                # TODO: log error
-                print("Pubsub: Data on {} could not be published to {}, because {}".format(topic, s, e))
+    __deliver(topic, args, kwargs)
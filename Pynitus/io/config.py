@@ -18,32 +18,110 @@
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from typing import Any
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, List, Mapping, Optional
 
 import yaml
 
-from Pynitus.framework import memcache
+from Pynitus.framework.pubsub import pub
+
+# TODO: absolute poth for config path in bootstrap script
+CONFIG_PATH = "./pynitus.yaml"
+RELOAD_INTERVAL = 1.0  # Seconds between two checks whether the config file changed
+
+# Keys which are only read on startup. Changing them takes effect after a restart,
+# config_changed isn't published for them.
+RESTART_KEYS = {
+    "hash_workers",
+    "hash_queue_size",
+    "database_url",
+    "database_pool_size",
+    "database_echo",
+    "sqlite_mmap_size",
+    "sqlite_cache_size",
+    "sqlite_busy_timeout"
+}
+
+# The config is kept in process as a read only snapshot, which is replaced
+# as a whole when the config file changes. Lookups never wait for a reload.
+__snapshot = None  # type: Optional[Mapping[str, Any]]
+__mtime = None
+__checked = 0.0
+__lock = threading.Lock()
+
+
+def __load() -> List[str]:
+    """
+    Loads the config file into a new snapshot, if it changed since it was last loaded.
+    :return: The keys whose values were changed, added or removed
+    """
+    global __snapshot, __mtime, __checked
+
+    with __lock:
+        __checked = time.monotonic()
+
+        mtime = os.stat(CONFIG_PATH).st_mtime
+        if mtime == __mtime:
+            return []
+
+        # TODO: log errors
+        with open(CONFIG_PATH) as f:
+            config = yaml.safe_load(f) or dict({})
+
+        old = __snapshot if __snapshot is not None else dict({})
+        changed = [k for k in set(old.keys()) | set(config.keys()) if old.get(k) != config.get(k)]
+
+        __snapshot = MappingProxyType(config)
+        __mtime = mtime
+
+    return changed
+
+
+def __reload() -> None:
+
+    try:
+        changed = __load()
+    except Exception as e:
+        # TODO: log error
+        print("Config: {} could not be reloaded, because {}".format(CONFIG_PATH, e))
+        return
+
+    restart = sorted(k for k in changed if k in RESTART_KEYS)
+    changed = [k for k in changed if k not in RESTART_KEYS]
+
+    if len(restart) > 0:
+        # TODO: log warning
+        print("Config: {} will be applied after a restart".format(", ".join(restart)))
+
+    if len(changed) > 0:
+        pub('config_changed', changed)
 
 
 def init_config():
     """
     Should be called once on server startup.
-    Initializes the persistent cache and loads all config values from disk.
+    Loads all config values from disk.
     :return: None
     """
-
-    # TODO: absolute poth for config path in bootstrap script
-    # TODO: log errors
-    with open("./pynitus.yaml") as f:
-        config = yaml.safe_load(f)
-
-    memcache.set("config", config)
+    __load()
 
 
 def get(key: str) -> Any:
     """
     Gets a value from the config by it's key.
+    The config file is checked for changes at most every RELOAD_INTERVAL seconds.
+    When it changed, config_changed is published with the list of changed keys,
+    except those in RESTART_KEYS.
     :param key: The key of the value
     :return: The value or None
     """
-    return memcache.get("config").get(key)
+
+    if __snapshot is None:
+        __load()
+    elif time.monotonic() - __checked > RELOAD_INTERVAL:
+        __reload()
+
+    return __snapshot.get(key)
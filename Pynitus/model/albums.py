@@ -1,70 +1,94 @@
-from typing import List
+from typing import List, Optional
 
-from Pynitus.model.db.database import db_session, persistance
-from sqlalchemy import asc
-from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+from Pynitus.model.db.database import db_session
 
 from Pynitus.model import artists
-from Pynitus.model.db.models import Album, Track, Status
+from Pynitus.model.db.models import Album
+from Pynitus.model.pagination import Position, paginate, stream
+
+SORT_COLUMNS = {
+    "title": Album.title,
+    "artist": Album.artist_id
+}
 
+# Loading strategy for albums which are listed by the API.
+# Every listed album is encoded with its artist.
+LISTED = (
+    joinedload(Album.artist),
+)
 
-def all(offset: int=0, limit: int=0, sorted_by: str= "title", sort_order: str= "asc") -> List[Album]:
+
+def all(offset: int=0, limit: int=0, sorted_by: str= "title", sort_order: str= "asc",
+        after: Optional[Position]=None, streamed: bool=False) -> List[Album]:
     """
     Returns all albums with one or more non hidden tracks in the database
     :param sort_order: Whether to sort "asc"ending or "desc"ending
     :param sorted_by: By which attribute to sort (title, artist)
     :param offset: How many albums to omit from the beginning of the result
     :param limit: The number of albums to return
+    :param after: The position to continue after, see Page.after
+    :param streamed: Whether to fetch the albums in batches while they are iterated, see pagination.stream
     :return: All albums with one or more non hidden tracks in the database
     """
 
     q = db_session.query(Album)\
-        .join(Track)\
-        .join(Track.status)\
-        .filter(Status.imported == True) \
-        .filter(Status.available == True) \
-        .group_by(Album.id)
-
-    order_by_column = Album.title if sorted_by == "title" else Album.artist
+        .options(*LISTED)\
+        .filter(Album.playable == True)
 
-    if sort_order == "desc":
-        q = q.order_by(desc(order_by_column))
-    else:
-        q = q.order_by(asc(order_by_column))
+    order_by_column = SORT_COLUMNS.get(sorted_by, Album.artist_id)
 
-    if offset > 0:
-        q = q.offset(offset)
+    if streamed:
+        return stream(q, order_by_column, Album.id, sort_order, offset, limit, after)
 
-    if limit > 0:
-        q = q.limit(limit)
+    return paginate(q, order_by_column, Album.id, sort_order, offset, limit, after)
 
-    return q.all()
 
+def from_artist(artist_id: int, offset: int=0, limit: int=0, sorted_by: Optional[str]=None, sort_order: str= "asc",
+                after: Optional[Position]=None) -> List[Album]:
+    """
+    Returns all albums of a specific artist with one or more non hidden tracks
+    :param artist_id: The id of the artist
+    :param sort_order: Whether to sort "asc"ending or "desc"ending
+    :param sorted_by: By which attribute to sort (title, artist), by default in the order they were added
+    :param offset: How many albums to omit from the beginning of the result
+    :param limit: The number of albums to return
+    :param after: The position to continue after, see Page.after
+    :return: All albums of the artist with one or more non hidden tracks
+    """
 
-def from_artist(artist_id: int) -> List[Album]:
-
-    artist = artists.get(artist_id)
+    q = db_session.query(Album)\
+        .options(*LISTED)\
+        .filter(Album.artist_id == artist_id)\
+        .filter(Album.playable == True)
 
-    if artist is None:
-        return []
+    order_by_column = SORT_COLUMNS.get(sorted_by, Album.id)
 
-    return artist.albums
+    return paginate(q, order_by_column, Album.id, sort_order, offset, limit, after)
 
 
 def get_or_create(title: str, artist: str) -> Album:
 
     a = artists.get_or_create(artist)
 
-    album = db_session.query(Album)\
+    q = db_session.query(Album)\
         .filter(Album.title == title)\
-        .filter(Album.artist == a) \
-        .first()
+        .filter(Album.artist == a)
+
+    album = q.first()
 
     if album is None:
-        with persistance():
+        try:
             album = Album(title=title)
             album.artist = a
             db_session.add(album)
+            db_session.commit()
+        except IntegrityError:
+            # Another request created the album in the meantime
+            db_session.rollback()
+            album = q.one()
 
     return album
 
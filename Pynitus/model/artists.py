@@ -1,43 +1,39 @@
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy import asc
-from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
 
-from Pynitus.model.db.database import db_session, persistance
-from Pynitus.model.db.models import Artist, Track, Status
+from Pynitus.model.db.database import db_session
+from Pynitus.model.db.models import Artist
+from Pynitus.model.pagination import Position, paginate, stream
 
+SORT_COLUMNS = {
+    "name": Artist.name,
+    "id": Artist.id
+}
 
-def all(offset: int=0, limit: int=0, sorted_by: str= "name", sort_order: str= "asc") -> List[Artist]:
+
+def all(offset: int=0, limit: int=0, sorted_by: str= "name", sort_order: str= "asc",
+        after: Optional[Position]=None, streamed: bool=False) -> List[Artist]:
     """
     Returns all artists with one or more non hidden tracks in the database
     :param sort_order: Whether to sort "asc"ending or "desc"ending
-    :param sorted_by: By which attribute to sort (title, artist)
+    :param sorted_by: By which attribute to sort (name, id)
     :param offset: How many artists to omit from the beginning of the result
     :param limit: The number of artists to return
+    :param after: The position to continue after, see Page.after
+    :param streamed: Whether to fetch the artists in batches while they are iterated, see pagination.stream
     :return: All artists with one or more non hidden tracks in the database
     """
 
     q = db_session.query(Artist)\
-        .join(Track)\
-        .join(Track.status)\
-        .filter(Status.imported == True) \
-        .filter(Status.available == True) \
-        .group_by(Artist.id)
-
-    order_by_column = Artist.name if sorted_by == "name" else Artist.artist
-
-    if sort_order == "desc":
-        q = q.order_by(desc(order_by_column))
-    else:
-        q = q.order_by(asc(order_by_column))
+        .filter(Artist.playable == True)
 
-    if offset > 0:
-        q = q.offset(offset)
+    order_by_column = SORT_COLUMNS.get(sorted_by, Artist.id)
 
-    if limit > 0:
-        q = q.limit(limit)
+    if streamed:
+        return stream(q, order_by_column, Artist.id, sort_order, offset, limit, after)
 
-    return q.all()
+    return paginate(q, order_by_column, Artist.id, sort_order, offset, limit, after)
 
 
 def get_or_create(name: str) -> Artist:
@@ -45,9 +41,14 @@ def get_or_create(name: str) -> Artist:
     artist = db_session.query(Artist).filter(Artist.name == name).first()
 
     if artist is None:
-        with persistance():
+        try:
             artist = Artist(name=name)
             db_session.add(artist)
+            db_session.commit()
+        except IntegrityError:
+            # Another request created the artist in the meantime
+            db_session.rollback()
+            artist = db_session.query(Artist).filter(Artist.name == name).one()
 
     return artist
 
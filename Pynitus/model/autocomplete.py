@@ -0,0 +1,225 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select
+
+from Pynitus.framework.pubsub import sub
+from Pynitus.model.db.database import engine
+from Pynitus.model.db.models import Artist, Album, Track
+from Pynitus.util.prefix_index import PrefixIndex
+from Pynitus.util.unicode import canonical_caseless
+
+# Suggestions for partially typed artist names, album titles and track titles
+# are served from a prefix index in process memory, which only contains
+# non hidden entries. Every word of a name starts a key, so that
+# "beat" suggests "The Beatles".
+#
+# Every process builds it's own index in the background when it starts.
+# Changes are applied incrementally on library_changed, which is only
+# published in the process that made the change, so the index is also
+# rebuilt every REBUILD_INTERVAL seconds to pick up changes of other processes.
+
+REBUILD_INTERVAL = 300
+MAX_WORDS = 8  # Words of a name after which no keys start anymore
+MAX_VARIABLES = 500
+LARGE_CHANGE = 500  # Changed entries from which the index is rebuilt instead of updated, e.g. by ingest
+QUIET_PERIOD = 1.0  # Seconds without large changes before rebuilding, so a running ingest isn't slowed down
+
+ARTIST = "artist"
+ALBUM = "album"
+TRACK = "track"
+
+__index = PrefixIndex()
+__names = dict({})  # type: Dict[Tuple[str, int], str]
+__built = None  # type: Optional[float]
+__building = False
+__stale = False
+__changed = 0.0
+__replay = []  # type: List[Dict[str, List[int]]]
+__lock = threading.Lock()
+
+__queries = {
+    ARTIST: select([Artist.id, Artist.name]).where(Artist.playable == True),
+    ALBUM: select([Album.id, Album.title]).where(Album.playable == True),
+    TRACK: select([Track.id, Track.title]).where(Track.playable == True),
+}
+__ids = {ARTIST: Artist.id, ALBUM: Album.id, TRACK: Track.id}
+
+
+def init_autocomplete():
+    """
+    Should be called once on server startup.
+    :return: None
+    """
+    sub("library_changed", library_changed)
+
+
+def keys(name: str) -> List[str]:
+    """
+    :param name: The name of an artist, album or track
+    :return: The normalized name starting at each of it's first words
+    """
+    words = canonical_caseless(name or "").split()
+    return [" ".join(words[i:]) for i in range(min(len(words), MAX_WORDS))]
+
+
+def __chunks(xs: List[Any]) -> Iterable[List[Any]]:
+    for i in range(0, len(xs), MAX_VARIABLES):
+        yield xs[i:i + MAX_VARIABLES]
+
+
+def __visible_names(kind: str, ids: Optional[List[int]]=None) -> Iterable[Tuple[int, str]]:
+
+    q = __queries[kind]
+
+    with engine.connect() as connection:
+        if ids is None:
+            return list(connection.execute(q))
+
+        q = q.where(__ids[kind].in_(bindparam('ids', expanding=True)))
+        return [row for chunk in __chunks(ids) for row in connection.execute(q, ids=chunk)]
+
+
+def __build() -> Tuple[PrefixIndex, Dict[Tuple[str, int], str]]:
+
+    names = dict({})
+
+    for kind in [ARTIST, ALBUM, TRACK]:
+        for entity_id, name in __visible_names(kind):
+            names[(kind, entity_id)] = name
+
+    return PrefixIndex((key, value) for value, name in names.items() for key in keys(name)), names
+
+
+def __rebuild() -> None:
+    global __index, __names, __built, __building, __stale, __replay
+
+    while True:
+        while time.monotonic() - __changed < QUIET_PERIOD:
+            time.sleep(QUIET_PERIOD)
+
+        try:
+            index, names = __build()
+        except Exception as e:
+            # TODO: log error
+            print("Autocomplete: The index could not be built, because {}".format(e))
+            index, names = None, None
+
+        with __lock:
+            if index is not None:
+                __index, __names = index, names
+
+            __built = time.monotonic()
+            replay, __replay = __replay, []
+
+            if not __stale:
+                __building = False
+                break
+
+            __stale = False
+
+    # Changes made while building may be missing from the new index
+    for changes in replay:
+        __apply(**changes)
+
+
+def start_building() -> None:
+    """
+    Builds the index in the background.
+    If that's already happening, the index is built again afterwards.
+    :return: None
+    """
+    global __building, __stale
+
+    with __lock:
+        if __building:
+            __stale = True
+            return
+
+        __building = True
+
+    threading.Thread(target=__rebuild, name="pynitus-autocomplete", daemon=True).start()
+
+
+def __apply(tracks: List[int], albums: List[int], artists: List[int]) -> None:
+
+    changed = {ARTIST: set(artists), ALBUM: set(albums), TRACK: set(tracks)}
+
+    if len(changed[TRACK]) > 0:
+        # A track becoming hidden or visible may hide or show it's album and artist
+        with engine.connect() as connection:
+            for chunk in __chunks(list(changed[TRACK])):
+                for album_id, artist_id in connection.execute(
+                        select([Track.album_id, Track.artist_id])
+                        .where(Track.id.in_(bindparam('ids', expanding=True))), ids=chunk):
+                    changed[ALBUM].add(album_id)
+                    changed[ARTIST].add(artist_id)
+
+    for kind, ids in changed.items():
+        ids.discard(None)
+
+        if len(ids) == 0:
+            continue
+
+        visible = dict(__visible_names(kind, list(ids)))
+
+        added = {(kind, entity_id): keys(name) for entity_id, name in visible.items()}
+        removed = [(kind, entity_id) for entity_id in ids if entity_id not in visible]
+
+        with __lock:
+            __index.update(added, removed)
+
+            for entity_id, name in visible.items():
+                __names[(kind, entity_id)] = name
+
+            for value in removed:
+                __names.pop(value, None)
+
+
+def library_changed(tracks: List[int], albums: List[int], artists: List[int]) -> None:
+    """
+    » Subscribed to library_changed
+    Updates the suggestions for the changed tracks, albums and artists.
+    :param tracks: The ids of the changed tracks
+    :param albums: The ids of the changed albums
+    :param artists: The ids of the changed artists
+    :return: None
+    """
+
+    global __changed
+
+    if len(tracks) + len(albums) + len(artists) > LARGE_CHANGE:
+        __changed = time.monotonic()
+        start_building()
+        return
+
+    with __lock:
+        if __building:
+            __replay.append({'tracks': tracks, 'albums': albums, 'artists': artists})
+
+    __apply(tracks, albums, artists)
+
+
+def suggest(prefix: str, limit: int=10) -> List[Dict[str, Any]]:
+    """
+    Suggests artists, albums and tracks for a partially typed name.
+    :param prefix: The beginning of a name or of one of it's words
+    :param limit: The maximum number of suggestions
+    :return: The type, id and name of the suggestions, in alphabetical order
+    """
+
+    if not __building and (__built is None or time.monotonic() - __built > REBUILD_INTERVAL):
+        start_building()
+
+    words = canonical_caseless(prefix).split()
+
+    if len(words) == 0:
+        return []
+
+    # A trailing space means the last word is complete
+    prefix = " ".join(words) + (" " if prefix[-1].isspace() else "")
+
+    with __lock:
+        found = __index.find(prefix, limit)
+        return [{'type': kind, 'id': entity_id, 'name': __names[(kind, entity_id)]} for kind, entity_id in found]
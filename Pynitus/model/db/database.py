@@ -1,10 +1,72 @@
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-engine = create_engine('sqlite:///pynitus.db', convert_unicode=True)
+from Pynitus.io import config
+
+DEFAULT_URL = "sqlite:///pynitus.db"
+
+# Pragmas applied to every new SQLite connection.
+# With a write ahead log readers don't wait for writers and vice versa,
+# synchronous=NORMAL only syncs the log at checkpoints, which is safe in WAL mode.
+SQLITE_PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("foreign_keys", "ON"),
+    ("temp_store", "MEMORY"),
+]
+
+
+def __sqlite_pragmas():
+    return SQLITE_PRAGMAS + [
+        ("mmap_size", int(config.get("sqlite_mmap_size") or 0)),
+        ("cache_size", int(config.get("sqlite_cache_size") or -2000)),
+        ("busy_timeout", int(config.get("sqlite_busy_timeout") or 0)),
+    ]
+
+
+def __create_engine() -> Engine:
+
+    url = make_url(config.get("database_url") or DEFAULT_URL)
+    pool_size = int(config.get("database_pool_size") or 5)
+    options = {
+        'convert_unicode': True,
+        'echo': bool(config.get("database_echo")),
+    }
+
+    if url.get_backend_name() != "sqlite":
+        options.update(pool_size=pool_size, max_overflow=pool_size, pool_pre_ping=True, pool_recycle=3600)
+        return create_engine(url, **options)
+
+    if url.database in (None, "", ":memory:"):
+        # Every connection would get a database of it's own, keep the default pool
+        e = create_engine(url, **options)
+    else:
+        # The pool hands connections to other threads, which is safe as long as they aren't shared
+        options.update(poolclass=QueuePool, pool_size=pool_size, max_overflow=pool_size,
+                       connect_args={'check_same_thread': False})
+        e = create_engine(url, **options)
+
+    pragmas = __sqlite_pragmas()
+
+    @event.listens_for(e, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+
+        for name, value in pragmas:
+            cursor.execute("PRAGMA {} = {}".format(name, value))
+
+        cursor.close()
+
+    return e
+
+
+engine = __create_engine()
 db_session = scoped_session(sessionmaker(autocommit=False,
                                          autoflush=False,
                                          bind=engine))
@@ -17,7 +79,10 @@ def init_db():
     # they will be registered properly on the metadata.  Otherwise
     # you will have to import them first before calling init_db()
 
+    from Pynitus.model.db.migrations import migrate
+
     Base.metadata.create_all(bind=engine)
+    migrate(engine)
     db_session.commit()
 
 
@@ -0,0 +1,113 @@
+from typing import Dict, Iterable, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from Pynitus.framework.pubsub import BLOCK, pub, dispatch_async
+from Pynitus.model import library
+from Pynitus.model.db.database import db_session
+from Pynitus.model.db.models import Artist, Album, Track, Status, Playlist, PlaylistTrack
+
+# Changes to tracks, albums, artists and their status are collected while
+# the session flushes and published as library_changed once the transaction
+# is committed. Rolled back changes are never published.
+#
+# Code writing to the library without the ORM (e.g. ingest) publishes its
+# changes itself with library_changed().
+#
+# The library version is increased right when changes to the library or to
+# playlists are committed, so that no response built after the commit can
+# carry the version from before it.
+
+CHANGES_KEY = "library_changes"
+VERSION_KEY = "library_version_changed"  # Changes which only increase the library version
+
+
+def init_library_events():
+    """
+    Should be called once on server startup.
+    :return: None
+    """
+    # Subscribers may query the library, which a session can't do while it commits
+    dispatch_async("library_changed", policy=BLOCK)
+
+
+def library_changed(tracks: Iterable[int]=(), albums: Iterable[int]=(), artists: Iterable[int]=()) -> None:
+    """
+    Publishes library_changed for tracks, albums and artists which were
+    added, changed or removed.
+    :param tracks: The ids of the changed tracks
+    :param albums: The ids of the changed albums
+    :param artists: The ids of the changed artists
+    :return: None
+    """
+    library.bump_version()
+    pub("library_changed", tracks=list(tracks), albums=list(albums), artists=list(artists))
+
+
+def __changes(session: Session) -> Dict[str, Set[int]]:
+    return session.info.setdefault(CHANGES_KEY, {"tracks": set(), "albums": set(), "artists": set()})
+
+
+@event.listens_for(db_session, "after_flush")
+def __collect(session: Session, flush_context) -> None:
+
+    changes = None
+
+    for o in session.new | session.dirty | session.deleted:
+
+        # Assigning an attribute its current value still marks the object dirty
+        if o in session.dirty and not session.is_modified(o):
+            continue
+
+        if isinstance(o, Track):
+            changes = changes or __changes(session)
+            changes["tracks"].add(o.id)
+
+            if o.album_id is not None:
+                changes["albums"].add(o.album_id)
+
+            if o.artist_id is not None:
+                changes["artists"].add(o.artist_id)
+
+        elif isinstance(o, Status) and o.track_id is not None:
+            changes = changes or __changes(session)
+            changes["tracks"].add(o.track_id)
+
+        elif isinstance(o, Album):
+            changes = changes or __changes(session)
+            changes["albums"].add(o.id)
+
+        elif isinstance(o, Artist):
+            changes = changes or __changes(session)
+            changes["artists"].add(o.id)
+
+        elif isinstance(o, (Playlist, PlaylistTrack)):
+            session.info[VERSION_KEY] = True
+
+
+@event.listens_for(db_session, "after_bulk_update")
+@event.listens_for(db_session, "after_bulk_delete")
+def __collect_bulk(context) -> None:
+
+    # The affected rows are unknown, so they can't be published
+    if context.mapper.class_ in (Artist, Album, Track, Status, Playlist, PlaylistTrack):
+        context.session.info[VERSION_KEY] = True
+
+
+@event.listens_for(db_session, "after_commit")
+def __publish(session: Session) -> None:
+
+    changes = session.info.pop(CHANGES_KEY, None)
+    version_changed = session.info.pop(VERSION_KEY, False)
+
+    if changes is not None:
+        library_changed(**changes)
+    elif version_changed:
+        library.bump_version()
+
+
+@event.listens_for(db_session, "after_rollback")
+def __discard(session: Session) -> None:
+    session.info.pop(CHANGES_KEY, None)
+    session.info.pop(VERSION_KEY, None)
@@ -0,0 +1,213 @@
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, Integer, MetaData, Table, and_, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+# Migrations upgrade the schema of an existing database to the one defined
+# in Pynitus.model.db.models. They run in order of their version at startup,
+# after all missing tables were created. The version of the last migration
+# which was applied is stored in the schema_version table.
+#
+# Migrations also run on new databases, so they must check whether their
+# changes were already made (e.g. by create_all) before making them.
+
+__metadata = MetaData()
+
+schema_version = Table(
+    'schema_version', __metadata,
+    Column('version', Integer, nullable=False)
+)
+
+MIGRATIONS = []  # type: List[Tuple[int, str, Callable[[Connection], None]]]
+
+
+def migration(version: int, description: str):
+    """
+    Registers a method as the migration to the given schema version.
+    :param version: The schema version after the migration
+    :param description: What the migration does
+    """
+
+    def wrapper(function):
+        MIGRATIONS.append((version, description, function))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return function
+
+    return wrapper
+
+
+def ensure_indexes(connection: Connection, table: Table) -> None:
+    """
+    Creates the indexes defined on the table which don't exist in the database.
+    Indexes on columns which don't exist yet are left to the migration adding the columns.
+    :param connection: The connection to the database
+    :param table: The table
+    :return: None
+    """
+
+    existing = {index['name'] for index in inspect(connection).get_indexes(table.name)}
+    columns = {column['name'] for column in inspect(connection).get_columns(table.name)}
+
+    for index in table.indexes:
+        if index.name not in existing and all(column.name in columns for column in index.columns):
+            index.create(connection)
+
+
+def ensure_columns(connection: Connection, table: Table) -> None:
+    """
+    Adds the columns defined on the table which don't exist in the database.
+    New columns must either be nullable or have a server default.
+    :param connection: The connection to the database
+    :param table: The table
+    :return: None
+    """
+
+    existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+
+    for column in table.columns:
+        if column.name in existing:
+            continue
+
+        ddl = "ALTER TABLE {} ADD COLUMN {} {}".format(
+            table.name, column.name, column.type.compile(dialect=connection.dialect)
+        )
+
+        if column.server_default is not None:
+            default = column.server_default.arg
+            ddl += " DEFAULT {}".format(
+                default if isinstance(default, str) else default.compile(dialect=connection.dialect)
+            )
+
+        if not column.nullable:
+            ddl += " NOT NULL"
+
+        connection.execute(ddl)
+
+
+def merge_duplicates(connection: Connection, table: Table, columns: List[str],
+                     references: List[Column]=()) -> None:
+    """
+    Merges rows which have equal values in all of the columns into the one with the lowest id,
+    so that a unique index can be created on the columns. Rows with a NULL in them are kept,
+    since they don't conflict in a unique index.
+    :param connection: The connection to the database
+    :param table: The table
+    :param columns: The names of the columns
+    :param references: Foreign key columns referring to the table, they are pointed to the merged row
+    :return: None
+    """
+
+    keys = [table.c[name] for name in columns]
+    duplicates = select([func.min(table.c.id)] + keys)\
+        .where(and_(*[key.isnot(None) for key in keys]))\
+        .group_by(*keys)\
+        .having(func.count() > 1)
+
+    for kept, *values in connection.execute(duplicates).fetchall():
+        merged = select([table.c.id])\
+            .where(and_(*[key == value for key, value in zip(keys, values)]))\
+            .where(table.c.id != kept)
+
+        for reference in references:
+            connection.execute(reference.table.update().where(reference.in_(merged)).values({reference.name: kept}))
+
+        connection.execute(table.delete().where(table.c.id.in_(merged)))
+
+
+def current_version(connection: Connection) -> int:
+    """
+    :param connection: The connection to the database
+    :return: The schema version of the database
+    """
+
+    schema_version.create(connection, checkfirst=True)
+    version = connection.execute(select([schema_version.c.version])).scalar()
+
+    if version is None:
+        connection.execute(schema_version.insert().values(version=0))
+        return 0
+
+    return version
+
+
+def migrate(engine: Engine) -> None:
+    """
+    Applies all migrations the database hasn't seen yet.
+    Every migration is applied in it's own transaction.
+    :param engine: The database engine
+    :return: None
+    """
+
+    with engine.begin() as connection:
+        version = current_version(connection)
+
+    for target, description, function in MIGRATIONS:
+
+        if target <= version:
+            continue
+
+        # TODO: log migration
+        print("Database: Migrating to schema version {}: {}".format(target, description))
+
+        with engine.begin() as connection:
+            function(connection)
+            connection.execute(schema_version.update().values(version=target))
+
+        version = target
+
+
+@migration(1, "Add indexes and unique constraints to the library")
+def __add_library_indexes(connection: Connection) -> None:
+    from Pynitus.model.db.models import Artist, Album, Track, Status, Playlist, PlaylistTrack
+
+    # Databases created before may contain duplicates, which the unique indexes don't allow.
+    # Artists are merged first, since merging them may turn their albums into duplicates.
+    merge_duplicates(connection, Artist.__table__, ['name'],
+                     [Album.__table__.c.artist_id, Track.__table__.c.artist_id])
+    merge_duplicates(connection, Album.__table__, ['title', 'artist_id'], [Track.__table__.c.album_id])
+    merge_duplicates(connection, Status.__table__, ['track_id'])
+
+    for model in [Artist, Album, Track, Status, Playlist, PlaylistTrack]:
+        ensure_indexes(connection, model.__table__)
+
+
+@migration(2, "Add the full text search index")
+def __add_search_index(connection: Connection) -> None:
+    from Pynitus.model import search
+
+    search.create_index(connection)
+
+
+@migration(3, "Keep whether tracks, albums and artists are playable")
+def __add_playable(connection: Connection) -> None:
+    from Pynitus.model.db import playable
+    from Pynitus.model.db.models import Artist, Album, Track
+
+    for model in [Artist, Album, Track]:
+        ensure_columns(connection, model.__table__)
+        ensure_indexes(connection, model.__table__)
+
+    playable.refresh_all(connection)
+
+
+@migration(4, "Count the playable tracks and albums of albums, artists and the library")
+def __add_counts(connection: Connection) -> None:
+    from Pynitus.model.db import playable
+    from Pynitus.model.db.models import Artist, Album, LibraryStats
+
+    for model in [Artist, Album]:
+        ensure_columns(connection, model.__table__)
+
+    LibraryStats.__table__.create(connection, checkfirst=True)
+    playable.refresh_all(connection)
+
+
+@migration(5, "Allow tracks with the same title on one album")
+def __allow_equal_titles(connection: Connection) -> None:
+    from Pynitus.model.db.models import Track
+
+    for index in inspect(connection).get_indexes(Track.__table__.name):
+        if index['name'] == 'ix_track_album_title' and index['unique']:
+            connection.execute("DROP INDEX ix_track_album_title")
+
+    ensure_indexes(connection, Track.__table__)
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, Boolean, LargeBinary, String, ForeignKey
+from sqlalchemy import Column, Integer, Boolean, LargeBinary, String, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
+from sqlalchemy.sql.expression import false, text
 
 from Pynitus.model.db.database import Base
 
@@ -12,6 +13,14 @@ class Artist(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(256))
+    playable = Column(Boolean, nullable=False, default=False, server_default=false())  # Has playable tracks
+    track_count = Column(Integer, nullable=False, default=0, server_default=text('0'))  # Playable tracks
+    album_count = Column(Integer, nullable=False, default=0, server_default=text('0'))  # Playable albums
+
+    __table_args__ = (
+        Index('ix_artist_name', 'name', unique=True),
+        Index('ix_artist_playable_name', 'playable', 'name'),
+    )
 
 
 class Album(Base):
@@ -21,6 +30,16 @@ class Album(Base):
     title = Column(String(256))
     artist_id = Column(Integer, ForeignKey('artist.id'))
     artist = relationship(Artist, backref=backref('albums', uselist=True))
+    playable = Column(Boolean, nullable=False, default=False, server_default=false())  # Has playable tracks
+    track_count = Column(Integer, nullable=False, default=0, server_default=text('0'))  # Playable tracks
+
+    __table_args__ = (
+        Index('ix_album_title_artist', 'title', 'artist_id', unique=True),
+        Index('ix_album_artist', 'artist_id'),
+        Index('ix_album_playable_title', 'playable', 'title'),
+        Index('ix_album_playable_artist', 'playable', 'artist_id'),
+    )
+
 
 class TagInfo(Base):
     __tablename__ = "taginfo"
@@ -40,6 +59,16 @@ class Track(Base):
     title = Column(String(256))
     mrl = Column(String(1024))
     backend = Column(String(128))
+    playable = Column(Boolean, nullable=False, default=False, server_default=false())  # Imported and available
+
+    __table_args__ = (
+        Index('ix_track_album_title', 'album_id', 'title'),
+        Index('ix_track_artist', 'artist_id'),
+        Index('ix_track_title', 'title'),
+        Index('ix_track_playable_title', 'playable', 'title'),
+        Index('ix_track_playable_album', 'playable', 'album_id'),
+        Index('ix_track_playable_artist', 'playable', 'artist_id'),
+    )
 
 
 class Status(Base):
@@ -51,12 +80,27 @@ class Status(Base):
     imported = Column(Boolean)
     available = Column(Boolean)
 
+    __table_args__ = (
+        Index('ix_status_track', 'track_id', unique=True),
+        Index('ix_status_visibility', 'imported', 'available', 'track_id'),
+    )
+
     def __init__(self, track: Track):
         self.imported = False
         self.available = False
         self.track = track
 
 
+class LibraryStats(Base):
+    __tablename__ = 'library_stats'
+
+    # There is a single row, which counts all playable tracks, albums and artists
+    id = Column(Integer, primary_key=True)
+    tracks = Column(Integer, nullable=False, default=0)
+    albums = Column(Integer, nullable=False, default=0)
+    artists = Column(Integer, nullable=False, default=0)
+
+
 class User(Base):
     __tablename__ = 'user'
 
@@ -74,6 +118,10 @@ class Playlist(Base):
     user = relationship(User, backref=backref('playlists', uselist=True))
     name = Column(String(1024))
 
+    __table_args__ = (
+        Index('ix_playlist_username', 'username'),
+    )
+
 
 class PlaylistTrack(Base):
     __tablename__ = 'playlist_tracks'
@@ -82,4 +130,8 @@ class PlaylistTrack(Base):
     playlist_id = Column(Integer, ForeignKey('playlist.id'))
     playlist = relationship(Playlist, backref=backref('tracks', uselist=True))
     track_id = Column(Integer, ForeignKey('track.id'))
-    track = relationship(Track)
\ No newline at end of file
+    track = relationship(Track)
+
+    __table_args__ = (
+        Index('ix_playlist_tracks_playlist_track', 'playlist_id', 'track_id'),
+    )
\ No newline at end of file
@@ -0,0 +1,270 @@
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_, bindparam, event, func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from Pynitus.model.db.database import db_session
+from Pynitus.model.db.models import Artist, Album, Track, Status, LibraryStats
+
+# Whether a track can be played (it is imported and available) is kept in
+# Track.playable, so that browsing the library doesn't need to join Status.
+# Albums and artists count their playable tracks and artists their albums
+# with playable tracks, they are playable if they have a playable track.
+# The single row of LibraryStats counts everything playable in the library.
+#
+# Counts are never recomputed, the difference a track makes when it becomes
+# playable or not is added to them, so updates cost O(changed tracks).
+# That happens in the transaction which changes the Status, by a listener
+# for ORM flushes and by ingest, which calls added() itself.
+
+MAX_VARIABLES = 500
+STATS_ID = 1
+REMOVED_KEY = "playable.removed"  # Session info holding what deleted rows counted, see __before_flush
+
+TrackDelta = Tuple[int, int, int]  # The album id, artist id and +1 (now playable) or -1 (not anymore)
+
+__tracks = Track.__table__
+__albums = Album.__table__
+__artists = Artist.__table__
+__status = Status.__table__
+__stats = LibraryStats.__table__
+
+__select_tracks = select([
+    __tracks.c.id, __tracks.c.album_id, __tracks.c.artist_id, __tracks.c.playable,
+    func.coalesce(and_(__status.c.imported == True, __status.c.available == True), False)
+])\
+    .select_from(__tracks.outerjoin(__status, __status.c.track_id == __tracks.c.id))\
+    .where(__tracks.c.id.in_(bindparam('ids', expanding=True)))
+__update_track = __tracks.update()\
+    .where(__tracks.c.id == bindparam('track_id'))\
+    .values(playable=bindparam('now_playable'))
+
+__count_albums = __albums.update()\
+    .where(__albums.c.id == bindparam('album_id'))\
+    .values(track_count=__albums.c.track_count + bindparam('tracks'))
+__mark_albums = __albums.update()\
+    .where(__albums.c.id.in_(bindparam('ids', expanding=True)))\
+    .values(playable=__albums.c.track_count > 0)
+__select_albums = select([__albums.c.id, __albums.c.track_count, __albums.c.artist_id])\
+    .where(__albums.c.id.in_(bindparam('ids', expanding=True)))
+
+__count_artists = __artists.update()\
+    .where(__artists.c.id == bindparam('artist_id'))\
+    .values(track_count=__artists.c.track_count + bindparam('tracks'),
+            album_count=__artists.c.album_count + bindparam('albums'))
+__mark_artists = __artists.update()\
+    .where(__artists.c.id.in_(bindparam('ids', expanding=True)))\
+    .values(playable=__artists.c.track_count > 0)
+__select_artists = select([__artists.c.id, __artists.c.track_count])\
+    .where(__artists.c.id.in_(bindparam('ids', expanding=True)))
+
+__select_removed_tracks = select([__tracks.c.album_id, __tracks.c.artist_id])\
+    .where(__tracks.c.id.in_(bindparam('ids', expanding=True)))\
+    .where(__tracks.c.playable == True)
+__select_removed_albums = select([__albums.c.artist_id])\
+    .where(__albums.c.id.in_(bindparam('ids', expanding=True)))\
+    .where(__albums.c.playable == True)
+__select_removed_artists = select([func.count()])\
+    .select_from(__artists)\
+    .where(__artists.c.id.in_(bindparam('ids', expanding=True)))\
+    .where(__artists.c.playable == True)
+
+__count_stats = __stats.update()\
+    .where(__stats.c.id == STATS_ID)\
+    .values(tracks=__stats.c.tracks + bindparam('tracks'),
+            albums=__stats.c.albums + bindparam('albums'),
+            artists=__stats.c.artists + bindparam('artists'))
+
+
+def __chunks(xs: List[int]) -> Iterable[List[int]]:
+    for i in range(0, len(xs), MAX_VARIABLES):
+        yield xs[i:i + MAX_VARIABLES]
+
+
+def __count(connection: Connection, count, mark, select_counted, key: str,
+            deltas: Dict[int, Dict[str, int]]) -> List[Tuple[tuple, int]]:
+    # Adds the deltas to the counts, returns the rows which became playable (+1) or not (-1)
+
+    deltas = {i: d for i, d in deltas.items() if i is not None and any(d.values())}
+    flipped = []
+
+    if len(deltas) == 0:
+        return flipped
+
+    connection.execute(count, [dict(d, **{key: i}) for i, d in deltas.items()])
+
+    for chunk in __chunks(list(deltas.keys())):
+        connection.execute(mark, ids=chunk)
+
+        for row in connection.execute(select_counted, ids=chunk):
+            now = row[1]
+            before = now - deltas[row[0]]['tracks']
+
+            if (before > 0) != (now > 0):
+                flipped.append((row, 1 if now > 0 else -1))
+
+    return flipped
+
+
+def apply(connection: Connection, track_deltas: Iterable[TrackDelta],
+          removed_albums: Iterable[int]=(), removed_artists: int=0) -> None:
+    """
+    Counts tracks which became playable or stopped being playable.
+    :param connection: The connection to the database, in the transaction which changed the tracks
+    :param track_deltas: The album id, artist id and +1 (now playable) or -1 (not anymore) of the tracks
+    :param removed_albums: The artist ids of deleted playable albums
+    :param removed_artists: The number of deleted playable artists
+    :return: None
+    """
+
+    albums = dict({})  # type: Dict[int, Dict[str, int]]
+    artists = dict({})  # type: Dict[int, Dict[str, int]]
+    stats = {'tracks': 0, 'albums': 0, 'artists': -removed_artists}
+
+    def artist(artist_id: int) -> Dict[str, int]:
+        return artists.setdefault(artist_id, {'tracks': 0, 'albums': 0})
+
+    for album_id, artist_id, delta in track_deltas:
+        stats['tracks'] += delta
+        albums.setdefault(album_id, {'tracks': 0})['tracks'] += delta
+        artist(artist_id)['tracks'] += delta
+
+    for artist_id in removed_albums:
+        stats['albums'] -= 1
+        artist(artist_id)['albums'] -= 1
+
+    for (_, _, artist_id), delta in __count(
+            connection, __count_albums, __mark_albums, __select_albums, 'album_id', albums):
+        stats['albums'] += delta
+        artist(artist_id)['albums'] += delta
+
+    for _, delta in __count(
+            connection, __count_artists, __mark_artists, __select_artists, 'artist_id', artists):
+        stats['artists'] += delta
+
+    if any(stats.values()):
+        connection.execute(__count_stats, **stats)
+
+
+def refresh(connection: Connection, track_ids: Iterable[int]) -> None:
+    """
+    Updates whether tracks are playable after their Status changed and counts the difference.
+    :param connection: The connection to the database, in the transaction which changed the tracks
+    :param track_ids: The ids of the tracks whose Status changed
+    :return: None
+    """
+
+    changed = []
+    deltas = []
+
+    for chunk in __chunks(list(set(track_ids))):
+        for track_id, album_id, artist_id, was_playable, now_playable in connection.execute(__select_tracks,
+                                                                                            ids=chunk):
+            if bool(was_playable) != bool(now_playable):
+                changed.append({'track_id': track_id, 'now_playable': bool(now_playable)})
+                deltas.append((album_id, artist_id, 1 if now_playable else -1))
+
+    if len(changed) > 0:
+        connection.execute(__update_track, changed)
+        apply(connection, deltas)
+
+
+def added(connection: Connection, tracks: Iterable[Tuple[int, int]]) -> None:
+    """
+    Counts new tracks, which were added as playable.
+    Cheaper than refresh, since their status doesn't need to be looked at.
+    :param connection: The connection to the database, in the transaction which added the tracks
+    :param tracks: The album id and artist id of the tracks
+    :return: None
+    """
+    apply(connection, [(album_id, artist_id, 1) for album_id, artist_id in tracks])
+
+
+def refresh_all(connection: Connection) -> None:
+    """
+    Recomputes whether every track, album and artist is playable and all counts.
+    :param connection: The connection to the database
+    :return: None
+    """
+
+    def count(table, *where):
+        return select([func.count()]).select_from(table).where(and_(*where)).as_scalar()
+
+    connection.execute(__tracks.update().values(playable=func.coalesce(
+        select([and_(__status.c.imported == True, __status.c.available == True)])
+        .where(__status.c.track_id == __tracks.c.id)
+        .as_scalar(),
+        False
+    )))
+
+    connection.execute(__albums.update().values(
+        track_count=count(__tracks, __tracks.c.album_id == __albums.c.id, __tracks.c.playable == True)
+    ))
+    connection.execute(__albums.update().values(playable=__albums.c.track_count > 0))
+
+    connection.execute(__artists.update().values(
+        track_count=count(__tracks, __tracks.c.artist_id == __artists.c.id, __tracks.c.playable == True),
+        album_count=count(__albums, __albums.c.artist_id == __artists.c.id, __albums.c.playable == True)
+    ))
+    connection.execute(__artists.update().values(playable=__artists.c.track_count > 0))
+
+    connection.execute(__stats.delete())
+    connection.execute(__stats.insert().values(
+        id=STATS_ID,
+        tracks=count(__tracks, __tracks.c.playable == True),
+        albums=count(__albums, __albums.c.playable == True),
+        artists=count(__artists, __artists.c.playable == True)
+    ))
+
+
+def __deleted_ids(session: Session, model: type) -> List[int]:
+    return [o.id for o in session.deleted if isinstance(o, model) and o.id is not None]
+
+
+@event.listens_for(db_session, "before_flush")
+def __before_flush(session: Session, flush_context, instances) -> None:
+
+    # Deleted rows can't be counted anymore, so their own counts are subtracted after the flush.
+    # Whether they are playable is read from the database while they still exist,
+    # the flags of loaded objects may be outdated, since refresh() doesn't update them.
+    track_ids = __deleted_ids(session, Track)
+    album_ids = __deleted_ids(session, Album)
+    artist_ids = __deleted_ids(session, Artist)
+
+    if len(track_ids) + len(album_ids) + len(artist_ids) == 0:
+        session.info.pop(REMOVED_KEY, None)
+        return
+
+    connection = session.connection()
+    removed_tracks = []
+    removed_albums = []
+    removed_artists = 0
+
+    for chunk in __chunks(track_ids):
+        removed_tracks += [(album_id, artist_id, -1)
+                           for album_id, artist_id in connection.execute(__select_removed_tracks, ids=chunk)]
+
+    for chunk in __chunks(album_ids):
+        removed_albums += [artist_id for artist_id, in connection.execute(__select_removed_albums, ids=chunk)]
+
+    for chunk in __chunks(artist_ids):
+        removed_artists += connection.execute(__select_removed_artists, ids=chunk).scalar()
+
+    session.info[REMOVED_KEY] = (removed_tracks, removed_albums, removed_artists)
+
+
+@event.listens_for(db_session, "after_flush")
+def __after_flush(session: Session, flush_context) -> None:
+
+    # Statuses which were assigned their current values don't change anything
+    track_ids = [o.track_id for o in session.new | session.dirty
+                 if isinstance(o, Status) and o.track_id is not None and (o in session.new or session.is_modified(o))]
+
+    removed_tracks, removed_albums, removed_artists = session.info.pop(REMOVED_KEY, ([], [], 0))
+
+    if len(track_ids) > 0:
+        refresh(session.connection(), track_ids)
+
+    if len(removed_tracks) + len(removed_albums) + removed_artists > 0:
+        apply(session.connection(), removed_tracks, removed_albums, removed_artists)
@@ -0,0 +1,227 @@
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.engine import Connection
+
+from Pynitus.model import search
+from Pynitus.model.db import playable
+from Pynitus.model.db.database import engine
+from Pynitus.model.db.events import library_changed
+from Pynitus.model.db.models import Artist, Album, Track, Status
+
+# Bulk ingest adds many tracks at once, bypassing the ORM.
+# Artists and albums are resolved through in-memory maps, which are filled
+# with the rows that already exist in the database on demand. Every batch
+# is inserted with one executemany per table and committed once.
+#
+# Tracks that already exist (the same file on the same album) are skipped,
+# tracks with equal titles on one album are not duplicates.
+# New tracks are added to the search index and their albums and artists
+# are marked playable in the same transaction, library_changed is published
+# after every batch.
+
+BATCH_SIZE = 1000
+MAX_VARIABLES = 500  # Keeps IN clauses below SQLite's limit of bound parameters
+
+__artists = Artist.__table__
+__albums = Album.__table__
+__tracks = Track.__table__
+__status = Status.__table__
+
+# The IN clauses are expanded when executed, so the statements are only compiled once
+__select_artists = select([__artists.c.id, __artists.c.name])\
+    .where(__artists.c.name.in_(bindparam('names', expanding=True)))
+__select_albums = select([__albums.c.id, __albums.c.title, __albums.c.artist_id])\
+    .where(__albums.c.artist_id.in_(bindparam('artist_ids', expanding=True)))
+__select_tracks = select([__tracks.c.id, __tracks.c.album_id, __tracks.c.mrl, __tracks.c.backend])\
+    .where(__tracks.c.album_id.in_(bindparam('album_ids', expanding=True)))
+
+
+class IngestReport(object):
+    """
+    What an ingest did and how long it took.
+    """
+
+    def __init__(self):
+        self.tracks = 0
+        self.skipped = 0
+        self.artists = 0
+        self.albums = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        :return: The number of records processed per second
+        """
+        return (self.tracks + self.skipped) / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        return "{} tracks, {} artists and {} albums added, {} tracks skipped in {:.2f}s ({:.0f} tracks/s)".format(
+            self.tracks, self.artists, self.albums, self.skipped, self.seconds, self.throughput
+        )
+
+
+def __chunks(xs: List[Any], n: int=MAX_VARIABLES) -> Iterator[List[Any]]:
+    for i in range(0, len(xs), n):
+        yield xs[i:i + n]
+
+
+def __batches(records: Iterable[Any], n: int) -> Iterator[List[Any]]:
+    batch = []
+
+    for record in records:
+        batch.append(record)
+
+        if len(batch) == n:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+def __resolve_artists(connection: Connection, names: List[str], artist_ids: Dict[str, int]) -> int:
+
+    missing = list({name for name in names if name not in artist_ids})
+
+    for chunk in __chunks(missing):
+        for artist_id, name in connection.execute(__select_artists, names=chunk):
+            artist_ids[name] = artist_id
+
+    new = [name for name in missing if name not in artist_ids]
+
+    if len(new) == 0:
+        return 0
+
+    connection.execute(__artists.insert(), [{'name': name} for name in new])
+
+    for chunk in __chunks(new):
+        for artist_id, name in connection.execute(__select_artists, names=chunk):
+            artist_ids[name] = artist_id
+
+    return len(new)
+
+
+def __resolve_albums(connection: Connection, keys: List[Tuple[str, int]],
+                     album_ids: Dict[Tuple[str, int], int]) -> int:
+
+    def fetch(wanted):
+        for chunk in __chunks(list({artist_id for _, artist_id in wanted})):
+            for album_id, title, artist_id in connection.execute(__select_albums, artist_ids=chunk):
+                if (title, artist_id) in wanted:
+                    album_ids[(title, artist_id)] = album_id
+
+    missing = {key for key in keys if key not in album_ids}
+
+    if len(missing) == 0:
+        return 0
+
+    fetch(missing)
+    new = [key for key in missing if key not in album_ids]
+
+    if len(new) == 0:
+        return 0
+
+    connection.execute(__albums.insert(), [{'title': title, 'artist_id': artist_id} for title, artist_id in new])
+    fetch(set(new))
+
+    return len(new)
+
+
+def __existing_tracks(connection: Connection, album_ids: List[int]) -> Dict[Tuple[int, str, str], int]:
+
+    existing = dict({})
+
+    for chunk in __chunks(album_ids):
+        for track_id, album_id, mrl, backend in connection.execute(__select_tracks, album_ids=chunk):
+            existing[(album_id, mrl, backend)] = track_id
+
+    return existing
+
+
+def __ingest_batch(connection: Connection, batch: List[Any], imported: bool, available: bool,
+                   artist_ids: Dict[str, int], album_ids: Dict[Tuple[str, int], int],
+                   report: IngestReport) -> List[int]:
+
+    report.artists += __resolve_artists(connection, [r.artist for r in batch], artist_ids)
+    report.albums += __resolve_albums(connection, [(r.album, artist_ids[r.artist]) for r in batch], album_ids)
+
+    batch_album_ids = list({album_ids[(r.album, artist_ids[r.artist])] for r in batch})
+    existing = __existing_tracks(connection, batch_album_ids)
+
+    rows = dict({})  # type: Dict[Tuple[int, str, str], Dict[str, Any]]
+    names = dict({})  # type: Dict[Tuple[int, str, str], Tuple[str, str, str]]
+
+    for r in batch:
+        artist_id = artist_ids[r.artist]
+        album_id = album_ids[(r.album, artist_id)]
+        key = (album_id, r.mrl, r.backend)
+
+        if key in existing or key in rows:
+            report.skipped += 1
+            continue
+
+        rows[key] = {
+            'title': r.title,
+            'artist_id': artist_id,
+            'album_id': album_id,
+            'mrl': r.mrl,
+            'backend': r.backend,
+            'playable': imported and available
+        }
+        names[key] = (r.title, r.artist, r.album)
+
+    if len(rows) == 0:
+        return []
+
+    connection.execute(__tracks.insert(), list(rows.values()))
+
+    inserted = __existing_tracks(connection, batch_album_ids)
+
+    connection.execute(__status.insert(), [{
+        'track_id': inserted[key],
+        'imported': imported,
+        'available': available
+    } for key in rows.keys()])
+
+    if imported and available:
+        playable.added(connection, [(row['album_id'], row['artist_id']) for row in rows.values()])
+
+    search.index(connection, [(inserted[key],) + names[key] for key in rows.keys()])
+
+    report.tracks += len(rows)
+    return [inserted[key] for key in rows.keys()]
+
+
+def ingest(records: Iterable[Any], imported: bool=False, available: bool=False,
+           batch_size: int=BATCH_SIZE) -> IngestReport:
+    """
+    Adds many tracks to the library at once.
+    :param records: The tracks to add, objects with title, artist, album, mrl and backend attributes
+                    (e.g. TrackRecord)
+    :param imported: Whether the new tracks are imported
+    :param available: Whether the new tracks are available
+    :param batch_size: How many records to insert and commit at once
+    :return: How many tracks, albums and artists were added and how long it took
+    """
+
+    report = IngestReport()
+    artist_ids = dict({})  # type: Dict[str, int]
+    album_ids = dict({})  # type: Dict[Tuple[str, int], int]
+    start = time.perf_counter()
+
+    for batch in __batches(records, batch_size):
+        with engine.begin() as connection:
+            track_ids = __ingest_batch(connection, batch, imported, available, artist_ids, album_ids, report)
+
+        if len(track_ids) > 0:
+            library_changed(tracks=track_ids)
+
+        report.batches += 1
+
+    report.seconds = time.perf_counter() - start
+
+    return report
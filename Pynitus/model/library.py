@@ -0,0 +1,59 @@
+import time
+from typing import Dict, Optional
+
+from Pynitus.framework import memcache
+from Pynitus.model.db.database import db_session
+from Pynitus.model.db.models import LibraryStats
+from Pynitus.model.db.playable import STATS_ID
+
+# The library version increases with every committed change to the library
+# or to playlists, so responses built from them can be revalidated by it.
+# It is kept in memcached, so that all processes share it. If memcached
+# loses it, it starts again at the current time in milliseconds, which is
+# larger than any version handed out before. If memcached can't be reached,
+# the version is unknown and responses can't be revalidated or cached.
+
+VERSION_KEY = "library.version"
+
+
+def __seed() -> int:
+    return int(time.time() * 1000)
+
+
+def version() -> Optional[int]:
+    """
+    :return: The current version of the library, or None if it can't be read from memcached
+    """
+
+    v = memcache.get(VERSION_KEY)
+
+    if v is None:
+        memcache.add(VERSION_KEY, __seed())
+        v = memcache.get(VERSION_KEY)
+
+    return int(v) if v is not None else None
+
+
+def bump_version() -> None:
+    """
+    Increases the library version after a change to the library or to playlists was committed.
+    :return: None
+    """
+
+    if memcache.incr(VERSION_KEY) is None:
+        memcache.add(VERSION_KEY, __seed())
+
+
+def stats() -> Dict[str, int]:
+    """
+    Counts everything playable in the library.
+    The counts are kept up to date when tracks change, so this is a single row lookup.
+    :return: The number of playable tracks, albums and artists
+    """
+
+    s = db_session.query(LibraryStats).get(STATS_ID)
+
+    if s is None:
+        return {'tracks': 0, 'albums': 0, 'artists': 0}
+
+    return {'tracks': s.tracks, 'albums': s.albums, 'artists': s.artists}
@@ -0,0 +1,117 @@
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, asc, desc, nullsfirst, nullslast, or_
+from sqlalchemy.orm import Query
+
+Position = Tuple[Any, int]
+
+STREAM_BATCH_SIZE = 500
+
+
+class Page(list):
+    """
+    A list of results, which also knows the position after its last element.
+    Hand the position back as after to get the next page.
+    """
+
+    def __init__(self, items, after: Optional[Position]=None):
+        super().__init__(items)
+        self.after = after
+
+
+def __order(q: Query, order_by_column, id_column, sort_order: str, offset: int, limit: int,
+            after: Optional[Position]) -> Query:
+
+    # NULLs sort before all values, comparing with them matches nothing
+    if after is not None:
+        value, last_id = after
+
+        if sort_order == "desc" and value is None:
+            q = q.filter(and_(order_by_column.is_(None), id_column < last_id))
+        elif sort_order == "desc":
+            q = q.filter(or_(
+                order_by_column < value,
+                and_(order_by_column == value, id_column < last_id),
+                order_by_column.is_(None)
+            ))
+        elif value is None:
+            q = q.filter(or_(
+                and_(order_by_column.is_(None), id_column > last_id),
+                order_by_column.isnot(None)
+            ))
+        else:
+            q = q.filter(or_(
+                order_by_column > value,
+                and_(order_by_column == value, id_column > last_id)
+            ))
+
+    if sort_order == "desc":
+        q = q.order_by(nullslast(desc(order_by_column)), desc(id_column))
+    else:
+        q = q.order_by(nullsfirst(asc(order_by_column)), asc(id_column))
+
+    if offset > 0:
+        q = q.offset(offset)
+
+    if limit > 0:
+        q = q.limit(limit)
+
+    return q
+
+
+def paginate(q: Query, order_by_column, id_column, sort_order: str="asc",
+             offset: int=0, limit: int=0, after: Optional[Position]=None) -> Page:
+    """
+    Sorts and limits a query.
+    Pages can either be selected by offset or by the position of the last
+    result of the previous page. The latter doesn't get slower the further
+    one pages and isn't thrown off by rows inserted in the meantime.
+    Rows are ordered by the order_by_column and their id, which breaks ties.
+    :param q: The query
+    :param order_by_column: By which column to sort
+    :param id_column: The primary key column of the queried model
+    :param sort_order: Whether to sort "asc"ending or "desc"ending
+    :param offset: How many results to omit from the beginning
+    :param limit: The number of results to return
+    :param after: The sort key and id of the last result of the previous page
+    :return: The results
+    """
+
+    results = __order(q, order_by_column, id_column, sort_order, offset, limit, after).all()
+
+    if limit <= 0 or len(results) < limit:
+        return Page(results)
+
+    last = results[-1]
+    return Page(results, (getattr(last, order_by_column.key), getattr(last, id_column.key)))
+
+
+def stream(q: Query, order_by_column, id_column, sort_order: str="asc",
+           offset: int=0, limit: int=0, after: Optional[Position]=None) -> Iterator[List[Any]]:
+    """
+    Sorts and limits a query like paginate, but fetches the results in batches
+    while they are iterated, instead of loading all of them at once.
+    Results which the caller doesn't hold on to are freed after their batch,
+    so memory use doesn't depend on the number of results.
+    :param q: The query
+    :param order_by_column: By which column to sort
+    :param id_column: The primary key column of the queried model
+    :param sort_order: Whether to sort "asc"ending or "desc"ending
+    :param offset: How many results to omit from the beginning
+    :param limit: The number of results to return
+    :param after: The sort key and id of the last result of the previous page
+    :return: The results, in batches of STREAM_BATCH_SIZE
+    """
+
+    batch = []
+
+    for result in __order(q, order_by_column, id_column, sort_order, offset, limit, after)\
+            .yield_per(STREAM_BATCH_SIZE):
+        batch.append(result)
+
+        if len(batch) == STREAM_BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
@@ -14,48 +14,38 @@
     along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from typing import List
+from typing import List, Optional
 
-from sqlalchemy import asc
-from sqlalchemy import desc
+from sqlalchemy.exc import IntegrityError
 
 from Pynitus import db_session
 from Pynitus.model.db.database import persistance
 from Pynitus.model.db.models import Playlist, User, PlaylistTrack
+from Pynitus.model.pagination import Position, paginate
 
+SORT_COLUMNS = {
+    "id": Playlist.id,
+    "playlist_name": Playlist.name,
+    "username": Playlist.username
+}
 
-def all(offset: int = 0, limit: int = 0, sorted_by: str = "id", sort_order: str = "asc") -> List[Playlist]:
+
+def all(offset: int = 0, limit: int = 0, sorted_by: str = "id", sort_order: str = "asc",
+        after: Optional[Position] = None) -> List[Playlist]:
     """
     Returns all non hidden tracks in the database
     :param sort_order: Whether to sort "asc"ending or "desc"ending
     :param sorted_by: By which attribute to sort (id, playlist_name, user_name, username)
     :param offset: The e.g. id of the track to start from
     :param limit: The number of tracks to return
+    :param after: The position to continue after, see Page.after
     :return: All non hidden tracks in the database
     """
     q = db_session.query(Playlist)
 
-    if sorted_by == "id":
-        col_order = Playlist.id
-    elif sorted_by == "playlist_name":
-        col_order = Playlist.name
-    elif sorted_by == "username":
-        col_order = Playlist.user
-    else:
-        col_order = Playlist.username
-
-    if sort_order == "desc":
-        q = q.order_by(desc(col_order))
-    else:
-        q = q.order_by(asc(col_order))
-
-    if offset > 0:
-        q = q.offset(offset)
-
-    if limit > 0:
-        q = q.limit(limit)
+    col_order = SORT_COLUMNS.get(sorted_by, Playlist.username)
 
-    return q.all()
+    return paginate(q, col_order, Playlist.id, sort_order, offset, limit, after)
 
 
 def get(p_id: int):
@@ -89,7 +79,7 @@ def create(username: str, playlist_name: str) -> Playlist:
     :return:
     """
     with persistance():
-        playlist = Playlist(user_id=username, name=playlist_name)
+        playlist = Playlist(username=username, name=playlist_name)
         db_session.add(playlist)
     return playlist
 
@@ -99,14 +89,21 @@ def add_track(playlist_id: int, track_id: int) -> bool:
     Add Track by id in Playlist by id
     :param playlist_id:
     :param track_id:
-    :return:
+    :return: succeed? Fails if the track doesn't exist
     """
     # TODO: Check if get returns None
     playlist = get(playlist_id)
-    with persistance():
+
+    # Not within persistance(), which would hide that the foreign key of the track was violated
+    try:
         playlist_tracks = PlaylistTrack(track_id=track_id)
         playlist_tracks.playlist = playlist
         db_session.add(playlist_tracks)
+        db_session.commit()
+    except IntegrityError:
+        db_session.rollback()
+        return False
+
     return True
 
 
@@ -135,10 +132,12 @@ def remove(playlist_id: int) -> bool:
     :param playlist_id: unique int of Playlist to remove
     :return: succeed?
     """
-    playlist = db_session.query(Playlist).filter(Playlist.id == playlist_id)
+    playlist = get(playlist_id)
     if playlist is None:
         return False
     else:
         with persistance():
+            # The tracks reference the playlist, so they have to go first
+            db_session.query(PlaylistTrack).filter(PlaylistTrack.playlist_id == playlist_id).delete()
             db_session.query(Playlist).filter(Playlist.id == playlist_id).delete()
         return True
@@ -0,0 +1,203 @@
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, and_, bindparam, event, inspect, literal_column, or_, \
+    select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from Pynitus.model import tracks
+from Pynitus.model.db.database import db_session
+from Pynitus.model.db.models import Track, Artist, Album
+from Pynitus.model.pagination import Page
+from Pynitus.util.unicode import canonical_caseless
+
+# Tracks are found through a SQLite FTS5 index over their title, artist and
+# album, which is kept in the track_search table with the track id as rowid.
+# All text is normalized with canonical_caseless before it is indexed or
+# searched for, so case and unicode representations fold consistently.
+#
+# The index is updated whenever tracks, or the names of their artists and
+# albums, are flushed by the ORM and when tracks are added by ingest.
+# Other databases have no index and fall back to LIKE queries.
+
+INDEXED_COLUMNS = ["title", "artist", "album"]
+RANKING = "bm25(10.0, 5.0, 2.0)"  # Weights of the indexed columns, matches in the title count most
+
+IndexEntry = Tuple[int, str, str, str]  # The track id, title, artist and album
+
+__metadata = MetaData()
+
+track_search = Table(
+    'track_search', __metadata,
+    Column('rowid', Integer, primary_key=True),
+    *[Column(name, Text) for name in INDEXED_COLUMNS]
+)
+
+
+def normalize(text: Optional[str]) -> str:
+    return canonical_caseless(text or "")
+
+
+def is_indexed(connection: Connection) -> bool:
+    """
+    :param connection: A database connection
+    :return: Whether the database has a full text index
+    """
+    return connection.dialect.name == "sqlite"
+
+
+def create_index(connection: Connection) -> None:
+    """
+    Creates the full text index and fills it with all tracks.
+    :param connection: A database connection
+    :return: None
+    """
+
+    if not is_indexed(connection):
+        return
+
+    connection.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS track_search USING fts5("
+        "{}, tokenize = 'unicode61 remove_diacritics 0', prefix = '2 3')".format(", ".join(INDEXED_COLUMNS))
+    )
+    connection.execute("INSERT INTO track_search(track_search, rank) VALUES ('rank', '{}')".format(RANKING))
+    connection.execute(track_search.delete())
+
+    index(connection, __entries(connection))
+
+
+def __entries(connection: Connection, *criteria) -> List[IndexEntry]:
+
+    tracks_table, artists_table, albums_table = Track.__table__, Artist.__table__, Album.__table__
+
+    entries = connection.execute(
+        select([tracks_table.c.id, tracks_table.c.title, artists_table.c.name, albums_table.c.title])
+        .select_from(tracks_table
+                     .outerjoin(artists_table, tracks_table.c.artist_id == artists_table.c.id)
+                     .outerjoin(albums_table, tracks_table.c.album_id == albums_table.c.id))
+        .where(and_(*criteria))
+    )
+
+    return [tuple(entry) for entry in entries]
+
+
+def index(connection: Connection, entries: Iterable[IndexEntry]) -> None:
+    """
+    Adds tracks to the full text index or replaces their entries.
+    :param connection: A database connection
+    :param entries: The track id, title, artist and album of the tracks
+    :return: None
+    """
+
+    if not is_indexed(connection):
+        return
+
+    rows = [dict(zip(['rowid'] + INDEXED_COLUMNS, [track_id] + [normalize(text) for text in texts]))
+            for track_id, *texts in entries]
+
+    if len(rows) == 0:
+        return
+
+    unindex(connection, [row['rowid'] for row in rows])
+    connection.execute(track_search.insert(), rows)
+
+
+def unindex(connection: Connection, track_ids: List[int]) -> None:
+    """
+    Removes tracks from the full text index.
+    :param connection: A database connection
+    :param track_ids: The ids of the tracks
+    :return: None
+    """
+
+    if not is_indexed(connection) or len(track_ids) == 0:
+        return
+
+    connection.execute(track_search.delete().where(track_search.c.rowid == bindparam('track_id')),
+                       [{'track_id': track_id} for track_id in track_ids])
+
+
+@event.listens_for(db_session, "after_flush")
+def __after_flush(session: Session, flush_context) -> None:
+
+    changed = [o for o in session.new | session.dirty if isinstance(o, Track) and o.id is not None]
+    removed = [o.id for o in session.deleted if isinstance(o, Track)]
+
+    # Renamed artists and albums change the entries of all their tracks
+    renamed_artists = [o.id for o in session.dirty
+                       if isinstance(o, Artist) and inspect(o).attrs.name.history.has_changes()]
+    renamed_albums = [o.id for o in session.dirty
+                      if isinstance(o, Album) and inspect(o).attrs.title.history.has_changes()]
+
+    if len(changed) == 0 and len(removed) == 0 and len(renamed_artists) == 0 and len(renamed_albums) == 0:
+        return
+
+    connection = session.connection()
+    unindex(connection, removed)
+    index(connection, [(
+        t.id,
+        t.title,
+        t.artist.name if t.artist is not None else None,
+        t.album.title if t.album is not None else None
+    ) for t in changed])
+
+    if len(renamed_artists) > 0 or len(renamed_albums) > 0:
+        index(connection, __entries(connection, or_(
+            Track.__table__.c.artist_id.in_(renamed_artists),
+            Track.__table__.c.album_id.in_(renamed_albums)
+        )))
+
+
+def __like_pattern(term: str) -> str:
+    # Wildcards in the query match themselves
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def __match_expression(terms: List[str]) -> str:
+    # Every term is matched as a prefix, quoting keeps FTS5 from interpreting operators
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def search(query: str, offset: int=0, limit: int=0) -> List[Track]:
+    """
+    Finds non hidden tracks by their title, artist and album.
+    Every word of the query has to match the beginning of a word of the track.
+    :param query: The search query
+    :param offset: How many tracks to omit from the beginning of the result
+    :param limit: The number of tracks to return
+    :return: The matching tracks, best matches first
+    """
+
+    terms = normalize(query).split()
+
+    if len(terms) == 0:
+        return Page([])
+
+    q = db_session.query(Track)\
+        .options(*tracks.LISTED)\
+        .filter(Track.playable == True)
+
+    if is_indexed(db_session.connection()):
+        hits = select([track_search.c.rowid.label('track_id'), literal_column('rank').label('rank')])\
+            .where(literal_column('track_search').match(__match_expression(terms)))\
+            .alias('hits')
+
+        q = q.join(hits, hits.c.track_id == Track.id)\
+            .order_by(hits.c.rank, Track.id)
+    else:
+        q = q.join(Artist, Track.artist_id == Artist.id)\
+            .join(Album, Track.album_id == Album.id)\
+            .filter(and_(*[or_(
+                Track.title.ilike(__like_pattern(term), escape='\\'),
+                Artist.name.ilike(__like_pattern(term), escape='\\'),
+                Album.title.ilike(__like_pattern(term), escape='\\')
+            ) for term in terms]))\
+            .order_by(Track.title, Track.id)
+
+    if offset > 0:
+        q = q.offset(offset)
+
+    if limit > 0:
+        q = q.limit(limit)
+
+    return Page(q.all())
@@ -1,147 +1,168 @@
-from typing import List
+from typing import List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 from Pynitus.model.db.database import db_session, persistance
-from sqlalchemy import desc, asc
 
-from Pynitus.model import albums, artists
+from Pynitus.model import albums
 from Pynitus.model.db.models import Track, Album, Artist, Status, PlaylistTrack
+from Pynitus.model.pagination import Position, paginate, stream
+
+SORT_COLUMNS = {
+    "title": Track.title,
+    "artist": Track.artist_id,
+    "album": Track.album_id
+}
+
+# Loading strategy for tracks which are listed by the API.
+# Every listed track is encoded with its artist and album and the artist of
+# the album, loading those lazily would cost up to three queries per track.
+LISTED = (
+    joinedload(Track.artist),
+    joinedload(Track.album).joinedload(Album.artist)
+)
 
 
-def all(offset: int=0, limit: int=0, sorted_by: str= "title", sort_order: str= "asc") -> List[Track]:
+def all(offset: int=0, limit: int=0, sorted_by: str= "title", sort_order: str= "asc",
+        after: Optional[Position]=None, streamed: bool=False) -> List[Track]:
     """
     Returns all non hidden tracks in the database
     :param sort_order: Whether to sort "asc"ending or "desc"ending
     :param sorted_by: By which attribute to sort (title, artist, album)
     :param offset: How many tracks to omit from the beginning of the result
     :param limit: The number of tracks to return
+    :param after: The position to continue after, see Page.after
+    :param streamed: Whether to fetch the tracks in batches while they are iterated, see pagination.stream
     :return: All non hidden tracks in the database
     """
 
     q = db_session.query(Track)\
-        .join(Track.status)\
-        .filter(Status.imported == True)\
-        .filter(Status.available == True)
+        .options(*LISTED)\
+        .filter(Track.playable == True)
 
-    if sorted_by == "title":
-        order_by_column = Track.title
-    elif sorted_by == "artist":
-        order_by_column = Track.artist
-    else:
-        order_by_column = Track.album
+    order_by_column = SORT_COLUMNS.get(sorted_by, Track.album_id)
 
-    if sort_order == "desc":
-        q = q.order_by(desc(order_by_column))
-    else:
-        q = q.order_by(asc(order_by_column))
+    if streamed:
+        return stream(q, order_by_column, Track.id, sort_order, offset, limit, after)
 
-    if offset > 0:
-        q = q.offset(offset)
+    return paginate(q, order_by_column, Track.id, sort_order, offset, limit, after)
 
-    if limit > 0:
-        q = q.limit(limit)
 
-    return q.all()
-
-
-def unimported(offset: int=0, limit: int=0, sorted_by: str= "title", sort_order: str= "asc") -> List[Track]:
+def unimported(offset: int=0, limit: int=0, sorted_by: str= "title", sort_order: str= "asc",
+               after: Optional[Position]=None) -> List[Track]:
     """
     Returns all non hidden tracks in the database
     :param sort_order: Whether to sort "asc"ending or "desc"ending
     :param sorted_by: By which attribute to sort (title, artist, album)
     :param offset: How many tracks to omit from the beginning of the result
     :param limit: The number of tracks to return
+    :param after: The position to continue after, see Page.after
     :return: All non hidden tracks in the database
     """
 
     q = db_session.query(Track)\
+        .options(*LISTED)\
         .join(Track.status)\
         .filter(Status.imported == False)
 
-    if sorted_by == "title":
-        order_by_column = Track.title
-    elif sorted_by == "artist":
-        order_by_column = Track.artist
-    else:
-        order_by_column = Track.album
-
-    if sort_order == "desc":
-        q = q.order_by(desc(order_by_column))
-    else:
-        q = q.order_by(asc(order_by_column))
-
-    if offset > 0:
-        q = q.offset(offset)
+    order_by_column = SORT_COLUMNS.get(sorted_by, Track.album_id)
 
-    if limit > 0:
-        q = q.limit(limit)
+    return paginate(q, order_by_column, Track.id, sort_order, offset, limit, after)
 
-    return q.all()
 
-
-def unavailable(offset: int=0, limit: int=0, sorted_by: str= "title", sort_order: str= "asc") -> List[Track]:
+def unavailable(offset: int=0, limit: int=0, sorted_by: str= "title", sort_order: str= "asc",
+                after: Optional[Position]=None) -> List[Track]:
     """
     Returns all non hidden tracks in the database
     :param sort_order: Whether to sort "asc"ending or "desc"ending
     :param sorted_by: By which attribute to sort (title, artist, album)
     :param offset: How many tracks to omit from the beginning of the result
     :param limit: The number of tracks to return
+    :param after: The position to continue after, see Page.after
     :return: All non hidden tracks in the database
     """
 
     q = db_session.query(Track)\
+        .options(*LISTED)\
         .join(Track.status)\
         .filter(Status.imported == True)\
         .filter(Status.available == False)
 
-    if sorted_by == "title":
-        order_by_column = Track.title
-    elif sorted_by == "artist":
-        order_by_column = Track.artist
-    else:
-        order_by_column = Track.album
+    order_by_column = SORT_COLUMNS.get(sorted_by, Track.album_id)
+
+    return paginate(q, order_by_column, Track.id, sort_order, offset, limit, after)
 
-    if sort_order == "desc":
-        q = q.order_by(desc(order_by_column))
-    else:
-        q = q.order_by(asc(order_by_column))
 
-    if offset > 0:
-        q = q.offset(offset)
+def on_album(album_id: int, offset: int=0, limit: int=0, sorted_by: Optional[str]=None, sort_order: str= "asc",
+             after: Optional[Position]=None) -> List[Track]:
+    """
+    Returns all non hidden tracks on a specific album
+    :param album_id: The id of the album
+    :param sort_order: Whether to sort "asc"ending or "desc"ending
+    :param sorted_by: By which attribute to sort (title, artist, album), by default in album order
+    :param offset: How many tracks to omit from the beginning of the result
+    :param limit: The number of tracks to return
+    :param after: The position to continue after, see Page.after
+    :return: All non hidden tracks on the album
+    """
 
-    if limit > 0:
-        q = q.limit(limit)
+    q = db_session.query(Track)\
+        .options(*LISTED)\
+        .filter(Track.album_id == album_id)\
+        .filter(Track.playable == True)
 
-    return q.all()
+    order_by_column = SORT_COLUMNS.get(sorted_by, Track.id)
 
+    return paginate(q, order_by_column, Track.id, sort_order, offset, limit, after)
 
-def on_album(album_id: int) -> List[Track]:
+
+def from_artist(artist_id: int, offset: int=0, limit: int=0, sorted_by: Optional[str]=None, sort_order: str= "asc",
+                after: Optional[Position]=None) -> List[Track]:
     """
-    Gets all tracks on a specific album
-    :param album_id:
-    :return:
+    Returns all non hidden tracks of a specific artist
+    :param artist_id: The id of the artist
+    :param sort_order: Whether to sort "asc"ending or "desc"ending
+    :param sorted_by: By which attribute to sort (title, artist, album), by default in the order they were added
+    :param offset: How many tracks to omit from the beginning of the result
+    :param limit: The number of tracks to return
+    :param after: The position to continue after, see Page.after
+    :return: All non hidden tracks of the artist
     """
 
-    album = albums.get(album_id)
+    q = db_session.query(Track)\
+        .options(*LISTED)\
+        .filter(Track.artist_id == artist_id)\
+        .filter(Track.playable == True)
+
+    order_by_column = SORT_COLUMNS.get(sorted_by, Track.id)
+
+    return paginate(q, order_by_column, Track.id, sort_order, offset, limit, after)
 
-    if album is None:
-        return []
 
-    return [t for t in album.tracks if t.status.available and t.status.imported]
+def get(track_id: int) -> Track:
 
+    return db_session.query(Track).get(track_id)
 
-def from_artist(artist_id: int) -> List[Track]:
 
-    artist = artists.get(artist_id)
+def get_many(track_ids: List[int]) -> List[Track]:
+    """
+    Gets multiple tracks at once
+    :param track_ids: The ids of the tracks
+    :return: The tracks in the order of their ids, ids of tracks that don't exist are skipped
+    """
 
-    if artist is None:
+    if len(track_ids) == 0:
         return []
 
-    return [t for t in artist.tracks if t.status.available and t.status.imported]
+    found = db_session.query(Track)\
+        .options(*LISTED)\
+        .filter(Track.id.in_(set(track_ids)))\
+        .all()
 
+    by_id = {t.id: t for t in found}
 
-def get(track_id: int) -> Track:
-
-    return db_session.query(Track).get(track_id)
+    return [by_id[i] for i in track_ids if i in by_id]
 
 
 def exists(title: str, artist: str, album: str) -> bool:
@@ -175,9 +196,13 @@ def get_or_create(title: str, artist: str, album: str) -> Track:
             db_session.add(t)
 
     if t.status is None:
-        with persistance():
+        try:
             s = Status(t)
             db_session.add(s)
+            db_session.commit()
+        except IntegrityError:
+            # Another request created the status in the meantime, it's loaded again on access
+            db_session.rollback()
 
     return t
 
@@ -188,8 +213,10 @@ def on_playlist(playlist_id: int) -> List[Track]:
     :param playlist_id: int to identify Playlist to get Tracks of
     :return: List of Tracks from Playlist
     """
-    tracks = []
-    q = db_session.query(PlaylistTrack).filter(PlaylistTrack.playlist_id == playlist_id).all()
-    for p_track in q:
-        tracks.append(p_track.track)
-    return tracks
+    q = db_session.query(PlaylistTrack)\
+        .options(joinedload(PlaylistTrack.track).joinedload(Track.artist),
+                 joinedload(PlaylistTrack.track).joinedload(Track.album).joinedload(Album.artist))\
+        .filter(PlaylistTrack.playlist_id == playlist_id)\
+        .order_by(PlaylistTrack.id)\
+        .all()
+    return [p_track.track for p_track in q]
@@ -8,6 +8,7 @@ def init_contributor_queue():
     sub("queue_add", add)
     sub("queue_remove", remove)
     sub("player.play_next", next)
+    sub("user_expired", user_expired)
 
 
 def add(track_id: int, user_token: str) -> None:
@@ -56,8 +57,27 @@ def next():
     pub("required_votes", __required_vote_count())
 
 
+def user_expired(user_token: str) -> None:
+    """
+    » Subscribed to user_expired
+    Users who left don't count as contributors any more. Their tracks stay in the queue.
+    :param user_token: The user token of the user who left
+    :return: None
+    """
+
+    queue = memcache.get("contributor_queue.items")
+
+    if all(t[1] != user_token for t in queue):
+        return
+
+    queue = [(t[0], None if t[1] == user_token else t[1]) for t in queue]
+    memcache.set("contributor_queue.items", queue)
+
+    pub("required_votes", __required_vote_count())
+
+
 def __required_vote_count():
     """
-    :return: The amount of unique contributors to the queue
+    :return: The amount of unique contributors to the queue, who are still around
     """
-    return len(set([t[1] for t in memcache.get("contributor_queue.items")]))
+    return len(set([t[1] for t in memcache.get("contributor_queue.items") if t[1] is not None]))
@@ -1,5 +1,5 @@
 from Pynitus.framework import memcache
-from Pynitus.framework.pubsub import pub, sub
+from Pynitus.framework.pubsub import pub, sub, dispatch_async
 
 
 def init_voting():
@@ -8,11 +8,24 @@ def init_voting():
     memcache.set("voting.required", 0)
 
     sub("required_votes", __set_required_votes)
+    dispatch_async("required_votes")
     sub("vote", vote)
+    sub("user_expired", user_expired)
 
 
 def __set_required_votes(n: int) -> None:
     memcache.set("voting.required", n)
+    __check_passed()
+
+
+def __check_passed() -> None:
+    # Also called when users leave, which may let a pending vote pass
+    count = memcache.get("voting.count")
+
+    if count > 0 and count >= memcache.get("voting.required"):
+        pub("vote_passed")
+        memcache.set("voting.count", 0)
+        memcache.set("voting.users", set({}))
 
 
 def vote(user_token: bytes):
@@ -24,7 +37,22 @@ def vote(user_token: bytes):
         memcache.set("voting.users", users)
         memcache.incr("voting.count")
 
-    if memcache.get("voting.count") >= memcache.get("voting.required"):
-        pub("vote_passed")
-        memcache.set("voting.count", 0)
-        memcache.set("voting.users", set({}))
+    __check_passed()
+
+
+def user_expired(user_token: str) -> None:
+    """
+    » Subscribed to user_expired
+    Withdraws the vote of a user who left.
+    :param user_token: The user token of the user who left
+    :return: None
+    """
+
+    users = memcache.get("voting.users")
+
+    if user_token in users:
+        users.remove(user_token)
+        memcache.set("voting.users", users)
+        memcache.decr("voting.count")
+
+    __check_passed()
@@ -0,0 +1,41 @@
+import requests
+import unittest
+
+from Pynitus.api.request_util import Response
+
+
+class TestAutocomplete(unittest.TestCase):
+
+    suggestion_amount = 3
+
+    def setUp(self):
+        self.track = requests.get("http://127.0.0.1:5000/tracks/all", params={"amount": 1}).json()[0]
+
+    def test_autocomplete_artist(self):
+
+        artist = self.track["data"]["artist"]
+        payload = {"q": artist["data"]["name"][:10]}
+        response = requests.get("http://127.0.0.1:5000/autocomplete", params=payload).json()
+
+        self.assertIn({"type": "artist", "id": artist["id"], "name": artist["data"]["name"]}, response)
+
+    def test_autocomplete_caseless(self):
+
+        payload = {"q": self.track["data"]["title"].upper()}
+        response = requests.get("http://127.0.0.1:5000/autocomplete", params=payload).json()
+
+        self.assertIn(self.track["id"], [s["id"] for s in response if s["type"] == "track"])
+
+    def test_autocomplete_amount(self):
+
+        payload = {"q": "a", "amount": self.suggestion_amount}
+        response = requests.get("http://127.0.0.1:5000/autocomplete", params=payload).json()
+
+        self.assertLessEqual(len(response), self.suggestion_amount)
+
+    def test_autocomplete_missing_param_q(self):
+
+        response = requests.get("http://127.0.0.1:5000/autocomplete").json()
+
+        self.assertEqual(response["success"], False)
+        self.assertEqual(response["reason"], Response.BAD_REQUEST)
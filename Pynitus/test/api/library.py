@@ -0,0 +1,40 @@
+import requests
+import unittest
+
+
+class TestLibrary(unittest.TestCase):
+
+    def test_library_stats(self):
+
+        stats = requests.get("http://127.0.0.1:5000/library/stats").json()
+        artists = requests.get("http://127.0.0.1:5000/artists/all").json()
+
+        self.assertEqual(stats["artists"], len(artists))
+        self.assertEqual(stats["tracks"], sum(a["data"]["track_count"] for a in artists))
+        self.assertEqual(stats["albums"], sum(a["data"]["album_count"] for a in artists))
+
+    def test_album_track_count(self):
+
+        album = requests.get("http://127.0.0.1:5000/albums/all", params={"amount": 1}).json()[0]
+        album_tracks = requests.get("http://127.0.0.1:5000/tracks/album/" + str(album["id"])).json()
+
+        self.assertEqual(album["data"]["track_count"], len(album_tracks))
+
+    def test_library_not_modified(self):
+
+        response = requests.get("http://127.0.0.1:5000/albums/all")
+        headers = {"If-None-Match": response.headers["ETag"]}
+
+        # The same ETag is sent for every content encoding
+        self.assertTrue(response.headers["ETag"].startswith("W/"))
+
+        self.assertEqual(requests.get("http://127.0.0.1:5000/albums/all", headers=headers).status_code, 304)
+        self.assertEqual(requests.get("http://127.0.0.1:5000/library/stats", headers=headers).status_code, 304)
+
+    def test_library_modified(self):
+
+        headers = {"If-None-Match": '"0"'}
+        response = requests.get("http://127.0.0.1:5000/albums/all", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], '"0"')
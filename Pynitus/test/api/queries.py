@@ -0,0 +1,84 @@
+import gzip
+import unittest
+
+from Pynitus import app
+from Pynitus.api import response_cache
+from Pynitus.model import playlists, users
+from Pynitus.test.db.query_count import QueryCountMixin
+
+
+class TestQueries(QueryCountMixin, unittest.TestCase):
+    """
+    The number of queries an endpoint issues must not grow with the number of results.
+    Runs in process against the database of the working directory.
+    """
+
+    def setUp(self):
+        self.client = app.test_client()
+        response_cache.clear()
+
+    def test_tracks_all_queries(self):
+        with self.assertQueryCount(1):
+            self.client.get("/tracks/all")
+
+    def test_tracks_unimported_queries(self):
+        with self.assertQueryCount(1):
+            self.client.get("/tracks/unimported")
+
+    def test_tracks_album_queries(self):
+        with self.assertQueryCount(1):
+            self.client.get("/tracks/album/2")
+
+    def test_tracks_artist_queries(self):
+        with self.assertQueryCount(1):
+            self.client.get("/tracks/artist/2")
+
+    def test_albums_artist_queries(self):
+        with self.assertQueryCount(1):
+            self.client.get("/albums/artist/2")
+
+    def test_albums_all_queries(self):
+        with self.assertQueryCount(1):
+            self.client.get("/albums/all")
+
+    def test_artists_all_queries(self):
+        with self.assertQueryCount(1):
+            self.client.get("/artists/all")
+
+    def test_library_stats_queries(self):
+        with self.assertQueryCount(1):
+            self.client.get("/library/stats")
+
+    def test_not_modified_queries(self):
+        etag = self.client.get("/tracks/all").headers["ETag"]
+
+        with self.assertQueryCount(0):
+            response = self.client.get("/tracks/all", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_queries(self):
+        response = self.client.get("/albums/all")
+
+        with self.assertQueryCount(0):
+            cached = self.client.get("/albums/all", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(cached.headers["X-Cache"], "HIT")
+        self.assertEqual(gzip.decompress(cached.data), response.data)
+
+    def test_playlists_id_queries(self):
+        with app.app_context():
+            if users.get("query_count") is None:
+                users.create("query_count", b"", b"")
+
+            playlist = playlists.create("query_count", "query_count")
+            playlist_id = playlist.id
+
+            for track_id in range(1, 11):
+                playlists.add_track(playlist_id, track_id)
+
+        with self.assertQueryCount(2):
+            self.client.get("/playlists/id/" + str(playlist_id))
+
+        with app.app_context():
+            playlists.remove(playlist_id)
@@ -0,0 +1,47 @@
+import requests
+import unittest
+
+from Pynitus.api.request_util import Response
+
+
+class TestSearch(unittest.TestCase):
+
+    pagination_amount = 5
+
+    def setUp(self):
+        self.track = requests.get("http://127.0.0.1:5000/tracks/all", params={"amount": 1}).json()[0]
+
+    def test_search_title(self):
+
+        payload = {"q": self.track["data"]["title"]}
+        response = requests.get("http://127.0.0.1:5000/search", params=payload).json()
+
+        self.assertEqual(response[0]["id"], self.track["id"])
+
+    def test_search_prefix_caseless(self):
+
+        payload = {"q": self.track["data"]["title"][:8].upper()}
+        response = requests.get("http://127.0.0.1:5000/search", params=payload).json()
+
+        self.assertIn(self.track["id"], [t["id"] for t in response])
+
+    def test_search_all_terms(self):
+
+        payload = {"q": self.track["data"]["artist"]["data"]["name"] + " " + self.track["data"]["album"]["data"]["title"]}
+        response = requests.get("http://127.0.0.1:5000/search", params=payload).json()
+
+        self.assertEqual([t["id"] for t in response], [self.track["id"]])
+
+    def test_search_pagination_amount(self):
+
+        payload = {"q": "a", "amount": self.pagination_amount}
+        response = requests.get("http://127.0.0.1:5000/search", params=payload).json()
+
+        self.assertLessEqual(len(response), self.pagination_amount)
+
+    def test_search_missing_param_q(self):
+
+        response = requests.get("http://127.0.0.1:5000/search").json()
+
+        self.assertEqual(response["success"], False)
+        self.assertEqual(response["reason"], Response.BAD_REQUEST)
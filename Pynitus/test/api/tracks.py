@@ -1,3 +1,4 @@
+import json
 import requests
 import unittest
 
@@ -37,6 +38,31 @@ class TestTracks(unittest.TestCase):
 
         self.assertLessEqual(len(response), self.pagination_offset)
 
+    def test_tracks_all_pagination_cursor(self):
+
+        all_ids = [t["id"] for t in requests.get("http://127.0.0.1:5000/tracks/all").json()]
+        paged_ids = []
+        payload = {"amount": self.pagination_offset}
+
+        while True:
+            response = requests.get("http://127.0.0.1:5000/tracks/all", params=payload)
+            paged_ids.extend([t["id"] for t in response.json()])
+
+            if "X-Next-Cursor" not in response.headers:
+                break
+
+            payload["cursor"] = response.headers["X-Next-Cursor"]
+
+        self.assertListEqual(paged_ids, all_ids)
+
+    def test_tracks_all_invalid_param_cursor(self):
+
+        payload = {"cursor": "invalid"}
+        response = requests.get("http://127.0.0.1:5000/tracks/all", params=payload).json()
+
+        self.assertEqual(response["success"], False)
+        self.assertEqual(response["reason"], Response.BAD_REQUEST)
+
     def test_tracks_all_invalid_param_offset(self):
 
         payload = {"offset": "invalid"}
@@ -53,6 +79,61 @@ class TestTracks(unittest.TestCase):
         self.assertEqual(response["success"], False)
         self.assertEqual(response["reason"], Response.BAD_REQUEST)
 
+    def test_tracks_all_stream_json(self):
+
+        payload = {"stream": "json"}
+        response = requests.get("http://127.0.0.1:5000/tracks/all", params=payload).json()
+
+        self.assertEqual(response, requests.get("http://127.0.0.1:5000/tracks/all").json())
+
+    def test_tracks_all_stream_ndjson(self):
+
+        payload = {"stream": "ndjson"}
+        response = requests.get("http://127.0.0.1:5000/tracks/all", params=payload).text
+
+        self.assertEqual([json.loads(line) for line in response.splitlines()],
+                         requests.get("http://127.0.0.1:5000/tracks/all").json())
+
+    def test_tracks_all_invalid_param_stream(self):
+
+        payload = {"stream": "invalid"}
+        response = requests.get("http://127.0.0.1:5000/tracks/all", params=payload).json()
+
+        self.assertEqual(response["success"], False)
+        self.assertEqual(response["reason"], Response.BAD_REQUEST)
+
+    def test_tracks_all_compound(self):
+
+        payload = {"format": "compound"}
+        response = requests.get("http://127.0.0.1:5000/tracks/all", params=payload).json()
+        nested = requests.get("http://127.0.0.1:5000/tracks/all").json()
+
+        self.assertEqual([track["id"] for track in response["data"]], [track["id"] for track in nested])
+
+        included = [(o["type"], o["id"]) for o in response["included"]]
+        referenced = set((reference["type"], reference["id"])
+                         for o in response["data"] + response["included"]
+                         for reference in o["data"].values() if isinstance(reference, dict))
+
+        self.assertEqual(len(included), len(set(included)))
+        self.assertEqual(set(included), referenced)
+
+    def test_tracks_all_invalid_param_format(self):
+
+        payload = {"format": "invalid"}
+        response = requests.get("http://127.0.0.1:5000/tracks/all", params=payload).json()
+
+        self.assertEqual(response["success"], False)
+        self.assertEqual(response["reason"], Response.BAD_REQUEST)
+
+    def test_tracks_all_stream_compound(self):
+
+        payload = {"stream": "json", "format": "compound"}
+        response = requests.get("http://127.0.0.1:5000/tracks/all", params=payload).json()
+
+        self.assertEqual(response["success"], False)
+        self.assertEqual(response["reason"], Response.BAD_REQUEST)
+
     # tracks.unavailable
 
     def test_tracks_unavailable(self):
@@ -0,0 +1,37 @@
+import timeit
+
+from Pynitus import app
+from Pynitus.framework import memcache
+from Pynitus.framework import pubsub
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def _legacy_pub(topic: str, *args, **kwargs) -> None:
+    # The former implementation, which fetched the subscriber table from memcached on every call
+    subscribers = memcache.get("bench.pubsub.topics").get(topic)
+
+    if subscribers is not None:
+        for s in subscribers:
+            s(*args, **kwargs)
+
+
+def benchmark_pub(n: int=10000):
+
+    with app.app_context():
+        pubsub.sub("bench.topic", _noop)
+        memcache.set("bench.pubsub.topics", {t: list(pubsub.subscribers(t)) for t in [
+            'user_activity', 'user_authenticated', 'queue_add', 'queue_remove', 'bench.topic'
+        ]})
+
+        legacy = timeit.timeit(lambda: _legacy_pub("bench.topic", "token"), number=n)
+        current = timeit.timeit(lambda: pubsub.pub("bench.topic", "token"), number=n)
+
+    print("legacy pub:  {:8.2f} µs/call".format(legacy / n * 1e6))
+    print("current pub: {:8.2f} µs/call".format(current / n * 1e6))
+
+
+if __name__ == "__main__":
+    benchmark_pub()
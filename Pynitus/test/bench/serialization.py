@@ -0,0 +1,78 @@
+import gzip
+import json
+import timeit
+
+from Pynitus.api.encoders import TrackEncoder
+from Pynitus.model.db.models import Artist, Album, Track
+
+
+class _LegacyEncoder(json.JSONEncoder):
+    # The former implementation, which built nested encoders and dicts for every track
+
+    def default(self, o):
+        if isinstance(o, Artist):
+            return {'id': o.id, 'type': 'artist', 'follow': '/artists/id/' + str(o.id), 'data': {
+                'name': o.name, 'track_count': o.track_count, 'album_count': o.album_count
+            }}
+
+        if isinstance(o, Album):
+            return {'id': o.id, 'type': 'album', 'follow': '/albums/id/' + str(o.id), 'data': {
+                'title': o.title, 'artist': _LegacyEncoder().default(o.artist), 'track_count': o.track_count
+            }}
+
+        if isinstance(o, Track):
+            return {'id': o.id, 'type': 'track', 'follow': '/tracks/id/' + str(o.id), 'data': {
+                'artist': _LegacyEncoder().default(o.artist),
+                'album': _LegacyEncoder().default(o.album),
+                'title': o.title
+            }}
+
+        return json.JSONEncoder.default(self, o)
+
+
+def _sample_tracks(n: int):
+
+    artists = [Artist(id=i, name="Artist {}".format(i), track_count=10, album_count=1) for i in range(n // 10)]
+    albums = [Album(id=i, title="Album {}".format(i), artist=artists[i], track_count=10) for i in range(n // 10)]
+
+    return [Track(id=i, title="Track {} – Ünïcödé".format(i), artist=artists[i // 10], album=albums[i // 10])
+            for i in range(n)]
+
+
+def benchmark_encode(n: int=100000):
+
+    tracks = _sample_tracks(n)
+
+    legacy = _LegacyEncoder().encode(tracks)
+    current = TrackEncoder().encode(tracks)
+
+    legacy_seconds = min(timeit.repeat(lambda: _LegacyEncoder().encode(tracks), number=1, repeat=3))
+    current_seconds = min(timeit.repeat(lambda: TrackEncoder().encode(tracks), number=1, repeat=3))
+
+    assert current == legacy, "The output differs from the former implementation"
+
+    print("{} tracks, {:.1f} MB".format(n, len(current) / 1e6))
+    print("legacy encode:  {:8.2f} s ({:8.2f} µs/track)".format(legacy_seconds, legacy_seconds / n * 1e6))
+    print("current encode: {:8.2f} s ({:8.2f} µs/track)".format(current_seconds, current_seconds / n * 1e6))
+
+
+def benchmark_compound(n: int=1000):
+
+    tracks = _sample_tracks(n)
+
+    nested = TrackEncoder().encode(tracks)
+    compound = TrackEncoder(compound=True).encode(tracks)
+
+    nested_seconds = min(timeit.repeat(lambda: TrackEncoder().encode(tracks), number=100, repeat=3)) / 100
+    compound_seconds = min(timeit.repeat(lambda: TrackEncoder(compound=True).encode(tracks), number=100, repeat=3)) / 100
+
+    print("{} tracks".format(n))
+    print("nested:   {:8.1f} kB ({:6.1f} kB gzip), {:8.2f} ms".format(
+        len(nested) / 1e3, len(gzip.compress(nested.encode())) / 1e3, nested_seconds * 1e3))
+    print("compound: {:8.1f} kB ({:6.1f} kB gzip), {:8.2f} ms".format(
+        len(compound) / 1e3, len(gzip.compress(compound.encode())) / 1e3, compound_seconds * 1e3))
+
+
+if __name__ == "__main__":
+    benchmark_encode()
+    benchmark_compound()
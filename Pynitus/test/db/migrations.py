@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, inspect
+
+from Pynitus.model.db.database import Base
+from Pynitus.model.db.migrations import migrate
+
+# The library tables as they were before the first migration
+BASELINE_SCHEMA = [
+    "CREATE TABLE artist (id INTEGER PRIMARY KEY, name VARCHAR(256))",
+    "CREATE TABLE album (id INTEGER PRIMARY KEY, title VARCHAR(256), artist_id INTEGER REFERENCES artist (id))",
+    "CREATE TABLE taginfo (id INTEGER PRIMARY KEY)",
+    "CREATE TABLE track (id INTEGER PRIMARY KEY, artist_id INTEGER REFERENCES artist (id), "
+    "album_id INTEGER REFERENCES album (id), title VARCHAR(256), mrl VARCHAR(1024), backend VARCHAR(128))",
+    "CREATE TABLE status (id INTEGER PRIMARY KEY, track_id INTEGER REFERENCES track (id), "
+    "imported BOOLEAN, available BOOLEAN)",
+    "CREATE TABLE user (username VARCHAR(128) PRIMARY KEY, password_hash BLOB, password_salt BLOB, "
+    "privilege_level INTEGER)",
+    "CREATE TABLE playlist (id INTEGER PRIMARY KEY, username VARCHAR(128) REFERENCES user (username), "
+    "name VARCHAR(1024))",
+    "CREATE TABLE playlist_tracks (id INTEGER PRIMARY KEY, playlist_id INTEGER REFERENCES playlist (id), "
+    "track_id INTEGER REFERENCES track (id))",
+]
+
+
+class TestMigrations(unittest.TestCase):
+    """
+    Migrates a database with the baseline schema, which contains duplicates
+    the unique indexes don't allow.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine("sqlite:///" + os.path.join(self.directory.name, "pynitus.db"))
+
+        for statement in BASELINE_SCHEMA:
+            self.engine.execute(statement)
+
+        self.engine.execute("INSERT INTO artist VALUES (1, 'Artist'), (2, 'Artist'), (3, NULL), (4, NULL)")
+        self.engine.execute("INSERT INTO album VALUES (1, 'Album', 1), (2, 'Album', 2), (3, 'Other', 2)")
+        self.engine.execute(
+            "INSERT INTO track VALUES (1, 1, 1, 'Intro', 'a.mp3', 'vlc_backend'), (2, 2, 2, 'Intro', 'b.mp3', "
+            "'vlc_backend'), (3, 2, 3, 'Song', 'c.mp3', 'vlc_backend')"
+        )
+        self.engine.execute("INSERT INTO status VALUES (1, 1, 1, 1), (2, 2, 1, 1), (3, 2, 0, 0), (4, 3, 1, 1)")
+
+        Base.metadata.create_all(bind=self.engine)
+        migrate(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_duplicates_merged(self):
+        self.assertEqual(self.engine.execute("SELECT id, name FROM artist ORDER BY id").fetchall(),
+                         [(1, 'Artist'), (3, None), (4, None)])
+        self.assertEqual(self.engine.execute("SELECT id, title, artist_id FROM album ORDER BY id").fetchall(),
+                         [(1, 'Album', 1), (3, 'Other', 1)])
+        self.assertEqual(self.engine.execute("SELECT id, track_id FROM status ORDER BY id").fetchall(),
+                         [(1, 1), (2, 2), (4, 3)])
+
+    def test_equal_titles_kept(self):
+        self.assertEqual(self.engine.execute("SELECT id, artist_id, album_id FROM track ORDER BY id").fetchall(),
+                         [(1, 1, 1), (2, 1, 1), (3, 1, 3)])
+
+    def test_counts(self):
+        self.assertEqual(self.engine.execute("SELECT track_count FROM album ORDER BY id").fetchall(), [(2,), (1,)])
+        self.assertEqual(self.engine.execute("SELECT tracks, albums, artists FROM library_stats").fetchall(),
+                         [(3, 2, 1)])
+
+    def test_indexes(self):
+        indexes = {index['name']: index['unique'] for index in inspect(self.engine).get_indexes('track')}
+        self.assertFalse(indexes['ix_track_album_title'])
+
+        indexes = {index['name']: index['unique'] for index in inspect(self.engine).get_indexes('artist')}
+        self.assertTrue(indexes['ix_artist_name'])
@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+
+from Pynitus.model.db.database import engine
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """
+    Records the SQL statements issued while the context is active.
+    :return: The list of statements, which is filled until the context is left
+    """
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+class QueryCountMixin(object):
+    """
+    Adds assertQueryCount to a TestCase.
+    """
+
+    @contextmanager
+    def assertQueryCount(self, expected: int):
+        with count_queries() as statements:
+            yield statements
+
+        self.assertEqual(len(statements), expected, "\n".join(statements))
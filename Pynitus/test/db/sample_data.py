@@ -1,14 +1,13 @@
 import os
+from collections import namedtuple
 
 from Pynitus import init_db
-from Pynitus.model import tracks
-from Pynitus.model.db.database import db_session, persistance
+from Pynitus.model import ingest
 
+SampleTrack = namedtuple("SampleTrack", ["title", "artist", "album", "mrl", "backend"])
 
-def generate_sample_tracks(n: int=10000):
 
-    import Pynitus.model.db.database
-    init_db()
+def sample_tracks(n: int):
 
     for i in range(n):
 
@@ -16,16 +15,16 @@ def generate_sample_tracks(n: int=10000):
         random_album_title = os.urandom(32).hex()
         random_artist_name = os.urandom(32).hex()
 
-        t = tracks.get_or_create(random_title, random_artist_name, random_album_title)
+        yield SampleTrack(random_title, random_artist_name, random_album_title, "test.mp3", "vlc_backend")
+
 
-        with persistance():
-            t.status.available = True
-            t.status.imported = True
-            t.backend = "vlc_backend"
-            t.mrl = "test.mp3"
+def generate_sample_tracks(n: int=10000):
+
+    import Pynitus.model.db.database
+    init_db()
 
-    db_session.close()
-    db_session.remove()
+    report = ingest.ingest(sample_tracks(n), imported=True, available=True)
+    print("Sample data: " + str(report))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+"""
+    Pynitus - A free and democratic music playlist
+    Copyright (C) 2017  Noah Hummel
+
+    This file is part of the Pynitus program, see <https://github.com/strangedev/Pynitus>.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+Value = Tuple  # Values have to be orderable, so that entries with the same key can be sorted
+
+
+class PrefixIndex(object):
+    """
+    Finds values by a prefix of their keys.
+    Entries are kept in a sorted list, so that all keys starting with a
+    prefix form a contiguous range, which is found by binary search.
+    Lookups cost O(log n + results), adding and removing costs O(n)
+    for moving the list, which is a single memmove.
+
+    A value may be stored under multiple keys.
+    Large numbers of changes are applied at once by update(), which copies
+    the list once instead of moving it for every key.
+    """
+
+    MERGE_THRESHOLD = 64  # Changes from which update() merges instead of inserting one by one
+
+    def __init__(self, entries: Iterable[Tuple[str, Value]]=()):
+        """
+        :param entries: The initial keys and values
+        """
+        self.__entries = sorted(set(entries))  # type: List[Tuple[str, Value]]
+        self.__keys = dict({})  # type: Dict[Value, List[str]]
+
+        for key, value in self.__entries:
+            self.__keys.setdefault(value, []).append(key)
+
+    def __len__(self):
+        return len(self.__keys)
+
+    def __contains__(self, value: Value):
+        return value in self.__keys
+
+    def add(self, keys: Iterable[str], value: Value) -> None:
+        """
+        Stores a value under the given keys.
+        If the value is already stored, it's old keys are replaced.
+        :param keys: The keys
+        :param value: The value
+        :return: None
+        """
+        self.remove(value)
+        keys = sorted(set(keys))
+
+        for key in keys:
+            insort(self.__entries, (key, value))
+
+        self.__keys[value] = keys
+
+    def remove(self, value: Value) -> None:
+        """
+        Removes a value, if it is stored.
+        :param value: The value
+        :return: None
+        """
+        for key in self.__keys.pop(value, []):
+            i = bisect_left(self.__entries, (key, value))
+            del self.__entries[i]
+
+    def update(self, added: Dict[Value, Iterable[str]], removed: Iterable[Value]=()) -> None:
+        """
+        Adds and removes many values at once.
+        :param added: The values to store with their keys, old keys of the values are replaced
+        :param removed: The values to remove
+        :return: None
+        """
+
+        removed = set(removed) | set(added.keys())
+
+        if len(removed) < self.MERGE_THRESHOLD:
+            for value in removed:
+                self.remove(value)
+
+            for value, keys in added.items():
+                self.add(keys, value)
+
+            return
+
+        gone = sorted((key, value) for value in removed for key in self.__keys.pop(value, []))
+        new = []
+
+        for value, keys in added.items():
+            keys = sorted(set(keys))
+            new.extend((key, value) for key in keys)
+            self.__keys[value] = keys
+
+        new.sort()
+
+        # Both passes copy the list slice by slice, only the changed positions are searched
+        kept = []
+        start = 0
+
+        for entry in gone:
+            i = bisect_left(self.__entries, entry, start)
+            kept.extend(self.__entries[start:i])
+            start = i + 1
+
+        kept.extend(self.__entries[start:])
+
+        entries = []
+        start = 0
+
+        for entry in new:
+            i = bisect_left(kept, entry, start)
+            entries.extend(kept[start:i])
+            entries.append(entry)
+            start = i
+
+        entries.extend(kept[start:])
+        self.__entries = entries
+
+    def find(self, prefix: str, limit: int=10) -> List[Value]:
+        """
+        Finds values with a key starting with the prefix.
+        :param prefix: The prefix
+        :param limit: The maximum number of values to return
+        :return: The values, ordered by their first matching key
+        """
+
+        found = []
+        seen = set()
+
+        for i in range(bisect_left(self.__entries, (prefix,)), len(self.__entries)):
+            key, value = self.__entries[i]
+
+            if not key.startswith(prefix) or len(found) >= limit:
+                break
+
+            if value not in seen:
+                seen.add(value)
+                found.append(value)
+
+        return found
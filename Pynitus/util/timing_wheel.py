@@ -0,0 +1,133 @@
+"""
+    Pynitus - A free and democratic music playlist
+    Copyright (C) 2017  Noah Hummel
+
+    This file is part of the Pynitus program, see <https://github.com/strangedev/Pynitus>.
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU Affero General Public License as published
+    by the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU Affero General Public License for more details.
+
+    You should have received a copy of the GNU Affero General Public License
+    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+from typing import Dict, Hashable, List, Tuple
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+LEVELS = 4
+
+
+class TimingWheel(object):
+    """
+    A hierarchical timing wheel.
+    Keys are scheduled to expire at a deadline and collected by advance().
+    Scheduling and cancelling are O(1), advancing the wheel costs O(expired keys)
+    plus the occasional cascade of a slot into the level below.
+
+    Level 0 has one slot per tick, every slot of level n spans SLOTS ** n ticks.
+    With 4 levels of 64 slots and a resolution of one second, deadlines
+    up to 194 days ahead are placed exactly, later ones are re-sorted when
+    they come into range.
+    """
+
+    def __init__(self, start: float, resolution: float=1.0):
+        """
+        :param start: The current time
+        :param resolution: The length of a tick in seconds
+        """
+        self.resolution = resolution
+        self.current = self.__tick(start)
+        self.__slots = [[dict({}) for _ in range(SLOTS)] for _ in range(LEVELS)]  # type: List[List[Dict[Hashable, int]]]
+        self.__positions = dict({})  # type: Dict[Hashable, Tuple[int, int]]
+
+    def __len__(self):
+        return len(self.__positions)
+
+    def __contains__(self, key: Hashable):
+        return key in self.__positions
+
+    def __tick(self, t: float) -> int:
+        return int(math.ceil(t / self.resolution))
+
+    def __insert(self, key: Hashable, tick: int) -> None:
+
+        delta = tick - self.current
+
+        for level in range(LEVELS):
+            if delta < SLOTS ** (level + 1) or level == LEVELS - 1:
+                break
+
+        if delta >= SLOTS ** LEVELS:
+            # Too far ahead, park it in the last slot in range of the top level
+            slot = ((self.current + SLOTS ** LEVELS - 1) >> (SLOT_BITS * level)) & (SLOTS - 1)
+        else:
+            slot = (tick >> (SLOT_BITS * level)) & (SLOTS - 1)
+
+        self.__slots[level][slot][key] = tick
+        self.__positions[key] = (level, slot)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """
+        Schedules a key to expire at the deadline.
+        If the key is already scheduled, it is moved to the new deadline.
+        :param key: The key
+        :param deadline: The time at which the key expires
+        :return: None
+        """
+        self.cancel(key)
+        # The current tick was already collected, so the earliest possible tick is the next one.
+        self.__insert(key, max(self.__tick(deadline), self.current + 1))
+
+    def cancel(self, key: Hashable) -> None:
+        """
+        Removes a key from the wheel, if it is scheduled.
+        :param key: The key
+        :return: None
+        """
+        position = self.__positions.pop(key, None)
+
+        if position is not None:
+            level, slot = position
+            del self.__slots[level][slot][key]
+
+    def advance(self, now: float) -> List[Hashable]:
+        """
+        Moves the wheel forward to the given time.
+        :param now: The current time
+        :return: All keys whose deadline has passed
+        """
+
+        expired = []
+        target = self.__tick(now)
+
+        while self.current < target:
+            self.current += 1
+
+            # Whenever a level completes a revolution, the next slot of the level above is sorted into it
+            for level in range(LEVELS - 1, 0, -1):
+                if self.current & ((1 << (SLOT_BITS * level)) - 1) == 0:
+                    slot = (self.current >> (SLOT_BITS * level)) & (SLOTS - 1)
+                    entries = self.__slots[level][slot]
+                    self.__slots[level][slot] = dict({})
+
+                    for key, tick in entries.items():
+                        self.__insert(key, max(tick, self.current))
+
+            slot = self.current & (SLOTS - 1)
+            entries = self.__slots[0][slot]
+            self.__slots[0][slot] = dict({})
+
+            for key in entries.keys():
+                del self.__positions[key]
+                expired.append(key)
+
+        return expired
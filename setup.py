@@ -16,6 +16,9 @@ setup(
         'PyYAML',
         'requests',
     ],
+    extras_require={
+        'brotli': ['brotli'],  # Responses are cached brotli compressed as well
+    },
     author='strangedev, Pynitus Universe',
     author_email='strange.dev@gmail.com',
     license='AGPL-3.0',